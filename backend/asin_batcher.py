@@ -0,0 +1,100 @@
+from typing import Dict, List, Set
+import asyncio
+import logging
+import re
+
+from fastapi import HTTPException
+
+from rate_limiter import BACKGROUND, upstream_priority
+
+ASIN_PATTERN = re.compile(r"[A-Z0-9]{10}")
+
+
+def normalize_asin(asin: str) -> str:
+    """Upper-cased ASIN as PAAPI returns it; 400 for anything that is not an ASIN"""
+    normalized = asin.strip().upper()
+    if not ASIN_PATTERN.fullmatch(normalized):
+        raise HTTPException(status_code=400, detail=f"Invalid ASIN: {asin}")
+    return normalized
+
+
+class AsinBatcher:
+    """Fold ASIN lookups arriving within a short window into one GetItems call.
+
+    Each caller gets back its own item, or None when the ASIN was not
+    returned. A batch is sent once ``max_batch`` distinct ASINs are waiting
+    or ``window`` seconds after the first lookup, whichever comes first.
+    A batch is sent at the most urgent priority of the lookups it carries.
+    Malformed ASINs are rejected before queuing, so they cannot fail the
+    GetItems call of the lookups batched with them.
+    """
+
+    def __init__(self, paapi_client, window: float = 0.005, max_batch: int = 10):
+        self.paapi_client = paapi_client
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_handle = None
+        self._priority = BACKGROUND
+        self._tasks: Set[asyncio.Task] = set()
+        self.lookups = 0
+        self.batches = 0
+        self.items_requested = 0
+
+    async def get_item(self, asin: str):
+        asin = normalize_asin(asin)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(asin, []).append(future)
+        self._priority = min(self._priority, upstream_priority.get())
+        self.lookups += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        priority, self._priority = self._priority, BACKGROUND
+        if pending:
+            task = asyncio.ensure_future(self._fetch(pending, priority))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, pending: Dict[str, List[asyncio.Future]], priority: int):
+        upstream_priority.set(priority)
+        self.batches += 1
+        self.items_requested += len(pending)
+        try:
+            response = await self.paapi_client.get_items_async(list(pending))
+        except Exception as e:
+            logging.error(f"Batched GetItems failed for {len(pending)} ASINs: {str(e)}")
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        items = {}
+        if response:
+            for item in (response.items if hasattr(response, 'items') else response) or []:
+                items[item.asin.upper()] = item
+
+        for asin, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(items.get(asin))
+
+    def stats(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "batches": self.batches,
+            "items_requested": self.items_requested,
+            "avg_batch_size": round(self.items_requested / self.batches, 2) if self.batches else 0.0,
+        }
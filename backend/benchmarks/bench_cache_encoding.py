@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Size and decode-time benchmark of the search cache storage formats.
+
+Compares format 1 (plain product dicts) with the compact format 2 of
+compact_results.py: BSON size of the document the search CacheTier writes,
+and the time to decode a document from BSON back into normalized products.
+
+Usage (from the backend directory):
+    python benchmarks/bench_cache_encoding.py [--sizes 10 15 100 1000] [--repeat 50] [--json]
+"""
+from datetime import timedelta
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_normalize import synthetic_items  # noqa: E402
+from cache_tier import CacheTier  # noqa: E402
+from coalesce import SingleFlight  # noqa: E402
+from compact_results import decode_results, encode_results  # noqa: E402
+from l1_cache import L1Cache  # noqa: E402
+from normalize import ProductNormalizer  # noqa: E402
+from response_bodies import dumps  # noqa: E402
+
+
+def search_tier(encode) -> CacheTier:
+    # Configured like server.search_results, with a body encoder so that
+    # anything it stores alongside the results shows up in the measurement
+    return CacheTier(
+        "product_searches", None, ["cache_key"], "results",
+        timedelta(hours=1), timedelta(hours=6),
+        L1Cache("product_searches"), SingleFlight("product_searches"),
+        body_encoder=lambda products: {"json": dumps(products)}, encode=encode, decode=decode_results
+    )
+
+
+def cache_document(tier: CacheTier, products) -> bytes:
+    """BSON of the document a search cache write stores"""
+    return bson.encode({"cache_key": "benchmark query_US_1", **tier._fields(products)})
+
+
+def best_decode_us(document: bytes, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode_results(bson.decode(document)["results"])
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1_000_000, 1)
+
+
+def bench(sizes, repeat: int) -> list:
+    normalizer = ProductNormalizer("US", "benchmark-20")
+    plain_tier, compact_tier = search_tier(None), search_tier(encode_results)
+    results = []
+    for size in sizes:
+        products = normalizer.normalize(synthetic_items(size))
+        plain = cache_document(plain_tier, products)
+        compact = cache_document(compact_tier, products)
+        assert decode_results(bson.decode(compact)["results"]) == products
+        results.append({
+            "items": size,
+            "v1_bytes": len(plain),
+            "v2_bytes": len(compact),
+            "size_ratio": round(len(compact) / len(plain), 3),
+            "v1_decode_us": best_decode_us(plain, repeat),
+            "v2_decode_us": best_decode_us(compact, repeat),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 15, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = bench(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps({"benchmark": "cache_encoding", "results": results}, indent=2))
+    else:
+        for row in results:
+            print(f"{row['items']:>6} items  v1 {row['v1_bytes']:>8} B  v2 {row['v2_bytes']:>8} B  "
+                  f"({row['size_ratio']:.3f})  decode v1 {row['v1_decode_us']:>9.1f} us  "
+                  f"v2 {row['v2_decode_us']:>9.1f} us")
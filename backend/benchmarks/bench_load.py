@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Concurrent load benchmark of the API, run in-process against the mock PAAPI backend.
+
+Starts the FastAPI app inside this process, talking straight to its ASGI
+interface. MongoDB is mongomock-motor by default (``pip install
+mongomock-motor``) or a real server given with ``--mongo-url``. Workloads:
+
+    cold_search    distinct queries, every one a cache miss
+    warm_search    the same queries again, served from cache (pre-warmed untimed first)
+    price_fanout   product grids fetching every product's price concurrently
+    autocomplete   users typing queries, one suggestion request per keystroke
+
+Before startup db.search_queries is seeded with ``--history`` past queries
+whose counts follow a Zipf distribution, so autocomplete walks a populated
+suggestion index; its typists pick queries from that history by popularity.
+
+Reports p50/p95/p99 latency, throughput, errors and upstream PAAPI calls
+per workload. Upstream behaviour follows the PAAPI_MOCK_* settings, e.g.
+PAAPI_MOCK_LATENCY_MS=100 PAAPI_MOCK_ERROR_RATE=0.01.
+
+Usage (from the backend directory):
+    python benchmarks/bench_load.py [--scenarios ...] [--concurrency 32] [--requests 200] [--json]
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+SCENARIOS = ["cold_search", "warm_search", "price_fanout", "autocomplete"]
+WORDS = ["yoga", "mat", "bluetooth", "headphones", "coffee", "mug", "lamp", "serum", "bottle", "novel",
+         "wireless", "earbuds", "storage", "box", "running", "shoes", "face", "mask", "tech", "guide"]
+
+
+def configure_environment(args):
+    # Must run before server is imported: it reads its configuration at import time
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("PAAPI_ACCESS_KEY", "benchmark")
+    os.environ.setdefault("PAAPI_SECRET_KEY", "benchmark")
+    os.environ.setdefault("PARTNER_TAG", "benchmark-20")
+    os.environ["PAAPI_TPS"] = str(args.tps)
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("mongomock-motor is not installed; install it or pass --mongo-url")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    # Keep the per-request mock logging out of the measurements
+    import logging
+    logging.disable(logging.INFO)
+
+
+async def call(app, method: str, path: str, body=None):
+    """Issue one request against the ASGI app; returns (status, response bytes)"""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    received = {"sent": False}
+    response = {"status": 0, "body": []}
+
+    async def receive():
+        if not received["sent"]:
+            received["sent"] = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], b"".join(response["body"])
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    async def timed(self, app, method, path, body=None):
+        start = time.perf_counter()
+        status, payload = await call(app, method, path, body)
+        self.latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            self.errors += 1
+        return status, payload
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_bounded(jobs, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(job):
+        async with semaphore:
+            await job()
+
+    await asyncio.gather(*[bounded(job) for job in jobs])
+
+
+def search_queries(args):
+    rng = random.Random(args.seed)
+    return [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}" for i in range(args.requests)]
+
+
+def query_history(args) -> list:
+    """(query, count) pairs of past searches, counts falling off as 1/rank like real query logs"""
+    rng = random.Random(args.seed)
+    queries = set()
+    while len(queries) < args.history:
+        queries.add(" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))))
+    ranked = sorted(queries)
+    rng.shuffle(ranked)
+    return [(query, max(1, args.history * 10 // rank)) for rank, query in enumerate(ranked, start=1)]
+
+
+async def seed_history(db, history):
+    now = time.time()
+    await db.search_queries.delete_many({})
+    await db.search_queries.insert_many([{"query": query, "count": count, "last_used": now} for query, count in history])
+
+
+async def scenario_search(app, recorder, args, queries):
+    jobs = [
+        (lambda query=query: recorder.timed(app, "POST", "/api/products/search", {"query": query, "country": "US"}))
+        for query in queries
+    ]
+    await run_bounded(jobs, args.concurrency)
+
+
+async def scenario_price_fanout(app, recorder, args, queries):
+    # Each grid is one search page whose products all fetch their price at once
+    grids = max(1, args.requests // args.grid_size)
+    asins = []
+    for query in queries[:grids]:
+        _, payload = await call(app, "POST", "/api/products/search", {"query": query, "country": "US"})
+        products = json.loads(payload).get("products", [])
+        asins.append([product["asin"] for product in products][:args.grid_size])
+
+    async def grid(grid_asins):
+        await asyncio.gather(*[recorder.timed(app, "GET", f"/api/products/{asin}/price") for asin in grid_asins])
+
+    await run_bounded([(lambda grid_asins=grid_asins: grid(grid_asins)) for grid_asins in asins],
+                      max(1, args.concurrency // args.grid_size))
+
+
+async def scenario_autocomplete(app, recorder, args, history):
+    async def typist(query):
+        for end in range(1, len(query) + 1):
+            await recorder.timed(app, "GET", f"/api/search-suggestions?q={query[:end].replace(' ', '%20')}")
+
+    # Users mostly type what others already searched for, so draw by popularity
+    rng = random.Random(args.seed)
+    users = max(1, args.requests // 10)
+    typed = rng.choices([query for query, _ in history], weights=[count for _, count in history], k=users)
+    await run_bounded([(lambda query=query: typist(query)) for query in typed], args.concurrency)
+
+
+async def bench(args) -> list:
+    import server
+    from metrics import paapi_request_duration
+
+    history = query_history(args)
+    await seed_history(server.db, history)
+    await server.app.router.startup()
+    try:
+        queries = search_queries(args)
+        results = []
+        for name in args.scenarios:
+            if name == "warm_search":
+                # Measure cache hits only, even when cold_search did not run first
+                await scenario_search(server.app, Recorder(), args, queries)
+            recorder = Recorder()
+            upstream_before = paapi_request_duration.counts()
+            start = time.perf_counter()
+            if name in ("cold_search", "warm_search"):
+                await scenario_search(server.app, recorder, args, queries)
+            elif name == "price_fanout":
+                await scenario_price_fanout(server.app, recorder, args, queries)
+            elif name == "autocomplete":
+                await scenario_autocomplete(server.app, recorder, args, history)
+            elapsed = time.perf_counter() - start
+            upstream_after = paapi_request_duration.counts()
+
+            latencies = sorted(recorder.latencies)
+            results.append({
+                "scenario": name,
+                "requests": len(latencies),
+                "errors": recorder.errors,
+                "seconds": round(elapsed, 3),
+                "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+                "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                "upstream_calls": {
+                    f"{region}:{operation}": upstream_after[(region, operation)] - upstream_before.get((region, operation), 0)
+                    for region, operation in upstream_after
+                    if upstream_after[(region, operation)] != upstream_before.get((region, operation), 0)
+                },
+            })
+        return results
+    finally:
+        await server.app.router.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="requests per search scenario")
+    parser.add_argument("--history", type=int, default=2000, help="past queries seeded into the suggestion index")
+    parser.add_argument("--grid-size", type=int, default=12, help="products per grid in price_fanout")
+    parser.add_argument("--tps", type=float, default=0, help="PAAPI rate limit per region (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-url", help="real MongoDB to use instead of mongomock-motor")
+    parser.add_argument("--db-name", default="benchmark")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    results = asyncio.run(bench(args))
+    if args.json:
+        config = {key: value for key, value in vars(args).items() if key not in ("json", "mongo_url")}
+        print(json.dumps({"benchmark": "load", "config": config, "results": results}, indent=2))
+    else:
+        for row in results:
+            upstream = ", ".join(f"{key}={value}" for key, value in row["upstream_calls"].items()) or "none"
+            print(f"{row['scenario']:<13} {row['requests']:>6} req  {row['throughput_rps']:>8.1f} req/s  "
+                  f"p50 {row['p50_ms']:>7.2f}  p95 {row['p95_ms']:>7.2f}  p99 {row['p99_ms']:>7.2f} ms  "
+                  f"errors {row['errors']}  upstream {upstream}")
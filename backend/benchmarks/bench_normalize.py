@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for ProductNormalizer on large synthetic PAAPI responses.
+
+Reports the per-item cost of normalizing responses of increasing size so it
+can be tracked between commits.
+
+Usage (from the backend directory):
+    python benchmarks/bench_normalize.py [--sizes 10 100 1000 10000] [--repeat 5] [--json]
+"""
+from collections import namedtuple
+from pathlib import Path
+import argparse
+import json
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from normalize import ProductNormalizer  # noqa: E402
+
+Item = namedtuple('Item', ['asin', 'item_info', 'images', 'offers', 'customer_reviews'])
+ItemInfo = namedtuple('ItemInfo', ['title'])
+Title = namedtuple('Title', ['display_value'])
+Images = namedtuple('Images', ['primary'])
+Primary = namedtuple('Primary', ['large'])
+Large = namedtuple('Large', ['url'])
+Offers = namedtuple('Offers', ['listings'])
+Listing = namedtuple('Listing', ['price', 'availability'])
+Price = namedtuple('Price', ['amount', 'currency'])
+Availability = namedtuple('Availability', ['message'])
+CustomerReviews = namedtuple('CustomerReviews', ['star_rating', 'count'])
+StarRating = namedtuple('StarRating', ['value'])
+
+TITLES = ["Bluetooth Headphones", "Coffee Mug", "Moisturizer", "Yoga Mat", "Cookbook", "Desk Lamp Organizer"]
+
+
+def synthetic_items(count: int) -> list:
+    items = []
+    for i in range(count):
+        # Every 7th item lacks offers and every 11th lacks reviews, like real responses
+        offers = None if i % 7 == 0 else Offers([Listing(Price(str(10 + i % 90 + 0.99), "USD"), Availability("In Stock"))])
+        reviews = None if i % 11 == 0 else CustomerReviews(StarRating(str(3.5 + (i % 15) / 10)), 50 + i % 450)
+        items.append(Item(
+            f"B{i:09d}",
+            ItemInfo(Title(f"{TITLES[i % len(TITLES)]} Model {i}")),
+            Images(Primary(Large(f"https://images.example.com/{i}.jpg"))),
+            offers,
+            reviews
+        ))
+    return items
+
+
+def bench(sizes, repeat: int) -> list:
+    normalizer = ProductNormalizer("US", "benchmark-20")
+    results = []
+    for size in sizes:
+        items = synthetic_items(size)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            normalizer.normalize(items)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({
+            "items": size,
+            "best_ms": round(best * 1000, 3),
+            "per_item_us": round(best / size * 1_000_000, 3),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = bench(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps({"benchmark": "normalize", "results": results}, indent=2))
+    else:
+        for row in results:
+            print(f"{row['items']:>7} items  {row['best_ms']:>10.3f} ms  {row['per_item_us']:>8.3f} us/item")
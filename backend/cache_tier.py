@@ -0,0 +1,324 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from circuit_breaker import UpstreamUnavailable
+from coalesce import SingleFlight
+from l1_cache import L1Cache
+from rate_limiter import BACKGROUND, upstream_priority
+from tracing import span
+
+Loader = Callable[[], Awaitable[Any]]
+StoreListener = Callable[[List[Any]], Awaitable[None]]
+BodyEncoder = Callable[[Any], Dict[str, bytes]]
+Codec = Callable[[Any], Any]
+
+
+class CacheTier:
+    """One cached resource: an L1 cache over a MongoDB collection, with stale-while-revalidate.
+
+    Entries are fresh until ``soft_ttl`` and still served until ``hard_ttl``.
+    Between the two, reads return the stale value at once and schedule one
+    background refresh; only past ``hard_ttl`` does a read wait on the loader.
+    Keys are tuples matching ``key_fields`` in the collection.
+
+    Loads that end in a 404 or an empty result are remembered in-process
+    for ``negative_ttl`` so repeated lookups do not go upstream again. When
+    upstream is unavailable, reads fall back to the last known document,
+    which the TTL index keeps for a retention period past ``hard_ttl``.
+    ``on_store``, if given, runs in a background task with the values of
+    every write, so listeners never add to the writer's latency.
+    With a ``body_encoder``, data entering L1 is also pre-encoded into
+    response bodies, which get_body() returns on later hits without
+    re-encoding; bodies live in-process only, MongoDB stores just the data.
+    ``encode``/``decode`` convert data to and from its stored form; decode
+    must accept every stored form still in the collection.
+    """
+
+    def __init__(self, name: str, collection, key_fields: List[str], data_field: str,
+                 soft_ttl: timedelta, hard_ttl: timedelta, l1: L1Cache, flight: SingleFlight,
+                 negative_ttl: timedelta = timedelta(minutes=1), on_store: Optional[StoreListener] = None,
+                 body_encoder: Optional[BodyEncoder] = None,
+                 encode: Optional[Codec] = None, decode: Optional[Codec] = None):
+        self.name = name
+        self.collection = collection
+        self.key_fields = key_fields
+        self.data_field = data_field
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.l1 = l1
+        self.flight = flight
+        self.negative_ttl = negative_ttl
+        self.on_store = on_store
+        self.body_encoder = body_encoder
+        self.encode = encode
+        self.decode = decode
+        self.bodies = L1Cache(f"{name}_bodies", l1.max_entries, l1.max_bytes) if body_encoder else None
+        self.negative = L1Cache(f"{name}_negative", l1.max_entries, l1.max_bytes)
+        self._refresh_tasks: Set[asyncio.Task] = set()
+        self._refreshing: Set[Tuple] = set()
+        self._store_tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.fallbacks = 0
+
+    def _filter(self, key: Tuple) -> dict:
+        return dict(zip(self.key_fields, key))
+
+    @staticmethod
+    def flight_key(key: Tuple) -> str:
+        return "_".join(str(part) for part in key)
+
+    def _data(self, doc: dict) -> Any:
+        stored = doc[self.data_field]
+        return self.decode(stored) if self.decode else stored
+
+    def _remember(self, key: Tuple, doc: dict, now: datetime) -> Tuple[Any, bool]:
+        # Documents written before soft TTLs existed have no fresh_until
+        fresh_until = doc.get("fresh_until") or doc["expires_at"]
+        data = self._data(doc)
+        ttl = (doc["expires_at"] - now).total_seconds()
+        fresh_ttl = (fresh_until - now).total_seconds()
+        self.l1.set(key, data, ttl, fresh_ttl)
+        if self.bodies is not None:
+            self.bodies.set(key, self.body_encoder(data), ttl, fresh_ttl)
+        return data, fresh_until <= now
+
+    def _count(self, stale: bool):
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+
+    async def get(self, key: Tuple) -> Optional[Tuple[Any, bool]]:
+        """Return (data, stale) from L1 or MongoDB, or None on a miss"""
+        entry = self.l1.lookup(key)
+        if entry is None:
+            now = datetime.utcnow()
+            with span("cache_read"):
+                doc = await self.collection.find_one({**self._filter(key), "expires_at": {"$gt": now}})
+            if not doc:
+                self.misses += 1
+                return None
+            entry = self._remember(key, doc, now)
+        self._count(entry[1])
+        return entry
+
+    def _grouped_queries(self, keys: Iterable[Tuple]):
+        # One $in query per group of keys sharing everything but the first field
+        groups: Dict[Tuple, List] = {}
+        for key in keys:
+            groups.setdefault(key[1:], []).append(key[0])
+        for tail, heads in groups.items():
+            yield tail, heads, {self.key_fields[0]: {"$in": heads}, **dict(zip(self.key_fields[1:], tail))}
+
+    async def get_many(self, keys: Iterable[Tuple]) -> Dict[Tuple, Tuple[Any, bool]]:
+        """Resolve many keys: L1 first, then one $in query per group of keys sharing their tail"""
+        found = {}
+        missing = []
+        for key in keys:
+            entry = self.l1.lookup(key)
+            if entry is not None:
+                found[key] = entry
+                self._count(entry[1])
+            else:
+                missing.append(key)
+
+        now = datetime.utcnow()
+        first_field = self.key_fields[0]
+        with span("cache_read"):
+            for tail, heads, query in self._grouped_queries(missing):
+                async for doc in self.collection.find({**query, "expires_at": {"$gt": now}}):
+                    key = (doc[first_field],) + tail
+                    found[key] = self._remember(key, doc, now)
+                    self._count(found[key][1])
+                self.misses += sum(1 for head in heads if (head,) + tail not in found)
+        return found
+
+    async def due_for_refresh(self, keys: Iterable[Tuple], within: timedelta) -> Set[Tuple]:
+        """Keys that are not cached or stop being fresh within ``within``"""
+        keys = list(keys)
+        deadline = datetime.utcnow() + within
+        first_field = self.key_fields[0]
+        fresh = set()
+        for tail, _, query in self._grouped_queries(keys):
+            async for doc in self.collection.find({**query, "fresh_until": {"$gt": deadline}}, {first_field: 1}):
+                fresh.add((doc[first_field],) + tail)
+        return {key for key in keys if key not in fresh}
+
+    async def get_body(self, key: Tuple, loader: Loader) -> Tuple[Dict[str, bytes], bool, bool]:
+        """Return (pre-encoded bodies, cached, stale) like get_or_fetch, reading MongoDB at most once"""
+        entry = self.bodies.lookup(key)
+        if entry is not None:
+            body, stale = entry
+            self._count(stale)
+            if stale:
+                self.refresh_in_background(key, loader)
+            return body, True, stale
+        data, cached, stale = await self.get_or_fetch(key, loader)
+        # Reads from MongoDB and fresh loads have just stored the bodies with the data
+        body = self.bodies.get(key)
+        if body is None:
+            # The data outlived its evicted bodies in L1: encode once more and keep them until the data expires
+            body = self.body_encoder(data)
+            remaining = self.l1.remaining_ttl(key)
+            if remaining is not None:
+                self.bodies.set(key, body, *remaining)
+        return body, cached, stale
+
+    def _fields(self, data: Any) -> dict:
+        now = datetime.utcnow()
+        fields = {
+            self.data_field: self.encode(data) if self.encode else data,
+            "fresh_until": now + self.soft_ttl,
+            "expires_at": now + self.hard_ttl,
+            "updated_at": now
+        }
+        return fields
+
+    def _update(self, fields: dict) -> dict:
+        # Documents written by earlier versions may still carry a stored body
+        return {"$set": fields, "$unset": {"body": ""}} if self.body_encoder else {"$set": fields}
+
+    def _remember_written(self, key: Tuple, data: Any):
+        self.l1.set(key, data, self.hard_ttl.total_seconds(), self.soft_ttl.total_seconds())
+        if self.bodies is not None:
+            self.bodies.set(key, self.body_encoder(data), self.hard_ttl.total_seconds(), self.soft_ttl.total_seconds())
+
+    async def put(self, key: Tuple, data: Any):
+        with span("cache_write"):
+            fields = self._fields(data)
+            await self.collection.update_one(self._filter(key), self._update(fields), upsert=True)
+            self._remember_written(key, data)
+            self._notify_stored([data])
+
+    async def put_many(self, entries: Dict[Tuple, Any]):
+        if not entries:
+            return
+        with span("cache_write"):
+            written = {key: self._fields(data) for key, data in entries.items()}
+            await self.collection.bulk_write(
+                [UpdateOne(self._filter(key), self._update(fields), upsert=True) for key, fields in written.items()],
+                ordered=False
+            )
+            for key in written:
+                self._remember_written(key, entries[key])
+            self._notify_stored(list(entries.values()))
+
+    def _notify_stored(self, values: List[Any]):
+        if not self.on_store:
+            return
+        task = asyncio.ensure_future(self._run_on_store(values))
+        self._store_tasks.add(task)
+        task.add_done_callback(self._store_tasks.discard)
+
+    async def _run_on_store(self, values: List[Any]):
+        try:
+            await self.on_store(values)
+        except Exception as e:
+            logging.warning(f"Store listener of {self.name} failed: {str(e)}")
+
+    async def wait_for_listeners(self):
+        """Wait until store listeners already scheduled have finished, e.g. before shutdown"""
+        if self._store_tasks:
+            await asyncio.gather(*list(self._store_tasks))
+
+    def remember_missing(self, key: Tuple, detail: str = "Not found"):
+        self.negative.set(key, (404, detail), self.negative_ttl.total_seconds())
+
+    def is_missing(self, key: Tuple) -> bool:
+        negative = self.negative.get(key)
+        return negative is not None and negative[0] == 404
+
+    async def fetch(self, key: Tuple, loader: Loader) -> Any:
+        """Load and store a value; concurrent fetches of one key share a single load"""
+        negative = self.negative.get(key)
+        if negative is not None:
+            status, result = negative
+            if status == 404:
+                raise HTTPException(status_code=404, detail=result)
+            return result
+
+        async def load_and_store():
+            try:
+                data = await loader()
+            except HTTPException as e:
+                if e.status_code == 404:
+                    self.remember_missing(key, e.detail)
+                raise
+            if data:
+                await self.put(key, data)
+            else:
+                self.negative.set(key, (200, data), self.negative_ttl.total_seconds())
+            return data
+
+        return await self.flight.do(self.flight_key(key), load_and_store)
+
+    async def last_known(self, keys: Iterable[Tuple]) -> Dict[Tuple, Any]:
+        """Most recent stored data for each key, however old"""
+        first_field = self.key_fields[0]
+        found = {}
+        for tail, _, query in self._grouped_queries(keys):
+            async for doc in self.collection.find(query):
+                found[(doc[first_field],) + tail] = self._data(doc)
+        self.fallbacks += len(found)
+        return found
+
+    async def get_or_fetch(self, key: Tuple, loader: Loader) -> Tuple[Any, bool, bool]:
+        """Return (data, cached, stale), refreshing stale entries in the background"""
+        entry = await self.get(key)
+        if entry is None:
+            try:
+                return await self.fetch(key, loader), False, False
+            except UpstreamUnavailable:
+                # Serve the last known data, however old, while upstream is down
+                last = await self.last_known([key])
+                if key not in last:
+                    raise
+                return last[key], True, True
+        data, stale = entry
+        if stale:
+            self.refresh_in_background(key, loader)
+        return data, True, stale
+
+    def refresh_in_background(self, key: Tuple, loader: Loader):
+        # A refresh already scheduled or a load in flight for this key absorbs the new request
+        if key in self._refreshing or self.flight.is_in_flight(self.flight_key(key)):
+            return
+        self.refreshes += 1
+        self._refreshing.add(key)
+        task = asyncio.ensure_future(self._refresh(key, loader))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        task.add_done_callback(lambda _: self._refreshing.discard(key))
+
+    async def _refresh(self, key: Tuple, loader: Loader):
+        # Runs in its own task, so the lower priority stays with this refresh
+        upstream_priority.set(BACKGROUND)
+        try:
+            await self.fetch(key, loader)
+        except Exception as e:
+            # Keep serving the stale entry until its hard TTL
+            self.refresh_errors += 1
+            logging.warning(f"Background refresh of {self.name} {self.flight_key(key)} failed: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "fallbacks": self.fallbacks,
+            "negative": self.negative.stats(),
+            **({"bodies": self.bodies.stats()} if self.bodies is not None else {}),
+            "soft_ttl_seconds": self.soft_ttl.total_seconds(),
+            "hard_ttl_seconds": self.hard_ttl.total_seconds(),
+        }
@@ -0,0 +1,97 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Sequence
+import json
+import os
+
+DEFAULT_CATEGORY = "General"
+DEFAULT_TAXONOMY_PATH = Path(__file__).parent / 'category_taxonomy.json'
+
+
+def load_taxonomy(path=None) -> List[dict]:
+    """Load the ordered category taxonomy: [{"value", "name", "keywords"}, ...].
+
+    Earlier entries win when a title matches keywords from several categories.
+    """
+    path = path or os.environ.get('CATEGORY_TAXONOMY_PATH') or DEFAULT_TAXONOMY_PATH
+    with open(path) as f:
+        taxonomy = json.load(f)
+    for entry in taxonomy:
+        if not entry.get("value") or not entry.get("keywords"):
+            raise ValueError(f"Invalid taxonomy entry in {path}: {entry}")
+        entry.setdefault("name", entry["value"])
+    return taxonomy
+
+
+class CategoryClassifier:
+    """Classify titles by keyword substring with a single Aho-Corasick automaton.
+
+    All keywords of all categories are compiled into one DFA, so a title is
+    scanned once regardless of how many categories or keywords exist.
+    """
+
+    def __init__(self, taxonomy: List[dict], default: str = DEFAULT_CATEGORY):
+        self.taxonomy = taxonomy
+        self.default = default
+        self.categories = [entry["value"] for entry in taxonomy]
+        self._no_match = len(self.categories)
+        self._delta, self._out = self._compile(taxonomy)
+
+    def _compile(self, taxonomy):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[int] = [self._no_match]
+        for priority, entry in enumerate(taxonomy):
+            for keyword in entry["keywords"]:
+                node = 0
+                for ch in keyword.lower():
+                    if ch not in goto[node]:
+                        goto.append({})
+                        out.append(self._no_match)
+                        goto[node][ch] = len(goto) - 1
+                    node = goto[node][ch]
+                out[node] = min(out[node], priority)
+
+        # Breadth-first pass: follow failure links and fold them into a full
+        # transition table so scanning never has to backtrack
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            out[node] = min(out[node], out[fail[node]])
+            transitions = dict(delta[fail[node]])
+            transitions.update(goto[node])
+            delta[node] = transitions
+            for ch, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(ch, 0) if node else 0
+                queue.append(child)
+        return delta, out
+
+    def classify(self, title: str) -> str:
+        return self.classify_batch([title])[0]
+
+    def classify_batch(self, titles: Sequence[str]) -> List[str]:
+        delta = self._delta
+        out = self._out
+        no_match = self._no_match
+        categories = self.categories
+        results = []
+        for title in titles:
+            node = 0
+            best = no_match
+            for ch in title.lower():
+                node = delta[node].get(ch, 0)
+                priority = out[node]
+                if priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+            results.append(categories[best] if best != no_match else self.default)
+        return results
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> CategoryClassifier:
+    return CategoryClassifier(load_taxonomy())
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from categories import DEFAULT_CATEGORY, get_classifier
+
+
+class CategoryCounts:
+    """Materialized product counts per (country, category).
+
+    ``memberships`` records the category of every (asin, country) written
+    to the product caches; ``counts`` holds one small document per
+    (country, category). record() diffs new products against their
+    memberships and applies the difference with $inc, so reads never
+    aggregate. Concurrent writers can still double count a new product;
+    reconcile() recomputes the counts from memberships seen within
+    ``max_age`` every ``reconcile_interval`` seconds and drops older ones.
+    """
+
+    def __init__(self, memberships, counts, reconcile_interval: float = 3600.0,
+                 max_age: timedelta = timedelta(days=30)):
+        self.memberships = memberships
+        self.counts = counts
+        self.reconcile_interval = reconcile_interval
+        self.max_age = max_age
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.changed = 0
+        self.reconciles = 0
+        self.corrected = 0
+        self.errors = 0
+
+    @staticmethod
+    def _category(product: dict) -> str:
+        # Detail views carry no category; classify them from the title
+        return product.get("category") or get_classifier().classify(product.get("title") or "")
+
+    async def record(self, products: Iterable[dict]):
+        """Count newly written products and move re-categorized ones"""
+        latest: Dict[Tuple[str, str], str] = {}
+        for product in products:
+            if product and product.get("asin") and product.get("country"):
+                latest[(product["asin"], product["country"])] = self._category(product)
+        if not latest:
+            return
+
+        try:
+            by_country: Dict[str, List[str]] = {}
+            for asin, country in latest:
+                by_country.setdefault(country, []).append(asin)
+            previous = {}
+            for country, asins in by_country.items():
+                cursor = self.memberships.find({"asin": {"$in": asins}, "country": country},
+                                               {"asin": 1, "category": 1, "_id": 0})
+                async for doc in cursor:
+                    previous[(doc["asin"], country)] = doc.get("category")
+
+            now = datetime.utcnow()
+            deltas: Dict[Tuple[str, str], int] = {}
+            for (asin, country), category in latest.items():
+                before = previous.get((asin, country))
+                if before == category:
+                    continue
+                if before is not None:
+                    deltas[(country, before)] = deltas.get((country, before), 0) - 1
+                deltas[(country, category)] = deltas.get((country, category), 0) + 1
+
+            await self.memberships.bulk_write([
+                UpdateOne({"asin": asin, "country": country},
+                          {"$set": {"category": category, "last_seen": now}}, upsert=True)
+                for (asin, country), category in latest.items()
+            ], ordered=False)
+            operations = [
+                UpdateOne({"country": country, "category": category},
+                          {"$inc": {"count": delta}, "$set": {"updated_at": now}}, upsert=True)
+                for (country, category), delta in deltas.items() if delta
+            ]
+            if operations:
+                await self.counts.bulk_write(operations, ordered=False)
+            self.recorded += len(latest)
+            self.changed += len(operations)
+        except Exception as e:
+            # The next reconcile picks up whatever this write missed
+            self.errors += 1
+            logging.error(f"Failed to update category counts for {len(latest)} products: {str(e)}")
+
+    async def reconcile(self):
+        """Recompute every count from recent memberships and overwrite drifted ones"""
+        now = datetime.utcnow()
+        await self.memberships.delete_many({"last_seen": {"$lt": now - self.max_age}})
+
+        actual: Dict[Tuple[str, str], int] = {}
+        pipeline = [{"$group": {"_id": {"country": "$country", "category": "$category"}, "count": {"$sum": 1}}}]
+        async for doc in self.memberships.aggregate(pipeline):
+            actual[(doc["_id"]["country"], doc["_id"]["category"])] = doc["count"]
+
+        stored = {}
+        async for doc in self.counts.find({}, {"country": 1, "category": 1, "count": 1, "_id": 0}):
+            stored[(doc["country"], doc["category"])] = doc.get("count", 0)
+
+        operations = [
+            UpdateOne({"country": country, "category": category},
+                      {"$set": {"count": actual.get((country, category), 0), "updated_at": now}}, upsert=True)
+            for country, category in set(actual) | set(stored)
+            if actual.get((country, category), 0) != stored.get((country, category))
+        ]
+        if operations:
+            await self.counts.bulk_write(operations, ordered=False)
+            logging.info(f"Reconciled {len(operations)} drifted category counts")
+        self.reconciles += 1
+        self.corrected += len(operations)
+
+    async def get(self, country: Optional[str] = None) -> List[dict]:
+        """Counts in taxonomy order, then General, then an All Categories total"""
+        totals: Dict[str, int] = {}
+        query = {"country": country} if country else {}
+        async for doc in self.counts.find(query, {"category": 1, "count": 1, "_id": 0}):
+            totals[doc["category"]] = totals.get(doc["category"], 0) + doc.get("count", 0)
+
+        categories = [
+            {"name": entry["name"], "value": entry["value"], "count": totals.get(entry["value"], 0)}
+            for entry in get_classifier().taxonomy
+        ]
+        if totals.get(DEFAULT_CATEGORY):
+            categories.append({"name": DEFAULT_CATEGORY, "value": DEFAULT_CATEGORY, "count": totals[DEFAULT_CATEGORY]})
+        categories.append({"name": "All Categories", "value": "", "count": sum(totals.values())})
+        return categories
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Category count reconcile failed: {str(e)}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "changed": self.changed,
+            "reconciles": self.reconciles,
+            "corrected": self.corrected,
+            "errors": self.errors,
+        }
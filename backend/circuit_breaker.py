@@ -0,0 +1,97 @@
+from typing import Optional
+import logging
+import time
+
+from fastapi import HTTPException
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(HTTPException):
+    """PAAPI could not serve a call: the breaker is open, the call failed or the queue is full"""
+
+    def __init__(self, country: str, reason: Optional[str] = None):
+        detail = f"Amazon API unavailable for {country}"
+        super().__init__(status_code=503, detail=f"{detail}: {reason}" if reason else detail)
+        self.country = country
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around one region's upstream calls.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail fast for ``reset_timeout`` seconds. It then lets a single
+    probe through (half-open): success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self, probe: bool = True) -> bool:
+        """Whether a call may go upstream now; in half-open state this claims the probe slot.
+
+        With ``probe`` False nothing is claimed, for a fail-fast check made
+        before waiting on something else; the call must then ask again.
+        """
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_started = None
+        if self.state == HALF_OPEN:
+            # A probe that never reported back frees the slot after reset_timeout
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                self.rejected += 1
+                return False
+            if probe:
+                self._probe_started = now
+        return True
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self._probe_started = None
+        if self.state != CLOSED:
+            logging.info(f"Circuit breaker for {self.name} closed")
+            self.state = CLOSED
+
+    def release(self):
+        """End a call that says nothing about upstream health, such as a rejected request"""
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._probe_started = None
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+                logging.warning(f"Circuit breaker for {self.name} opened after "
+                                f"{self.consecutive_failures} consecutive failures")
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "successes": self.successes,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
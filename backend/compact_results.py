@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional
+
+# Storage formats of a cached search result page:
+#   1 - the normalized product dicts as they are served (a plain list)
+#   2 - {"v": 2, ...}: one row per product, holding only what cannot be derived
+COMPACT_VERSION = 2
+
+# Keys of a normalized search product, in the order they are served
+PRODUCT_FIELDS = ("asin", "title", "image_url", "price", "rating", "review_count",
+                  "category", "affiliate_url", "country", "last_updated")
+
+
+def _split_url(url: Optional[str]):
+    if not url:
+        return None, None
+    cut = url.rfind("/") + 1
+    return url[:cut], url[cut:]
+
+
+def encode_results(products: List[dict]) -> Any:
+    """Compact form of a normalized result page, or the page itself when it does not fit format 2.
+
+    Every product of a page shares its country, timestamp and affiliate URL
+    pattern, so those are stored once. Image URLs are split into a shared
+    prefix table and a per-product suffix, and prices become [amount, currency].
+    """
+    if not products:
+        return products
+    first = products[0]
+    if not first.get("asin") or first["asin"] not in (first.get("affiliate_url") or ""):
+        return products
+    url_prefix, url_suffix = first["affiliate_url"].split(first["asin"], 1)
+    country = first.get("country")
+    last_updated = first.get("last_updated")
+
+    image_prefixes: Dict[str, int] = {}
+    rows = []
+    for product in products:
+        if (tuple(product) != PRODUCT_FIELDS
+                or product["country"] != country
+                or product["last_updated"] != last_updated
+                or product["affiliate_url"] != f"{url_prefix}{product['asin']}{url_suffix}"):
+            # Not derivable from the page header; keep the page as is
+            return products
+        prefix, suffix = _split_url(product["image_url"])
+        price = product["price"]
+        if price is not None and tuple(price) != ("amount", "currency"):
+            return products
+        rows.append([
+            product["asin"],
+            product["title"],
+            image_prefixes.setdefault(prefix, len(image_prefixes)) if prefix is not None else None,
+            suffix,
+            [price["amount"], price["currency"]] if price is not None else None,
+            product["rating"],
+            product["review_count"],
+            product["category"],
+        ])
+
+    return {
+        "v": COMPACT_VERSION,
+        "country": country,
+        "last_updated": last_updated,
+        "url": [url_prefix, url_suffix],
+        "images": list(image_prefixes),
+        "rows": rows,
+    }
+
+
+def decode_results(stored: Any) -> List[dict]:
+    """Normalized result page from either storage format"""
+    if isinstance(stored, list):
+        return stored
+    version = stored.get("v") if isinstance(stored, dict) else None
+    if version != COMPACT_VERSION:
+        raise ValueError(f"Unknown cached results format: {version}")
+
+    country = stored["country"]
+    last_updated = stored["last_updated"]
+    url_prefix, url_suffix = stored["url"]
+    images = stored["images"]
+    return [
+        {
+            "asin": asin,
+            "title": title,
+            "image_url": images[image] + image_suffix if image is not None else image_suffix,
+            "price": {"amount": price[0], "currency": price[1]} if price is not None else None,
+            "rating": rating,
+            "review_count": review_count,
+            "category": category,
+            "affiliate_url": f"{url_prefix}{asin}{url_suffix}",
+            "country": country,
+            "last_updated": last_updated,
+        }
+        for asin, title, image, image_suffix, price, rating, review_count, category in stored["rows"]
+    ]
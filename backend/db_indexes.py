@@ -0,0 +1,71 @@
+import logging
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+
+# Key fields identifying one cache entry in each cache collection
+CACHE_COLLECTION_KEYS = {
+    "product_searches": ["cache_key"],
+    # No longer written (advanced search derives from product_searches); kept
+    # so the TTL index drains the documents cached before that change
+    "advanced_searches": ["cache_key"],
+    "products": ["asin", "country"],
+    "prices": ["asin", "country"],
+}
+
+# How long expired cache documents are kept as a fallback, unless configured
+DEFAULT_CACHE_RETENTION_SECONDS = 24 * 3600
+
+# Unique keys of the non-expiring collections
+UNIQUE_KEYS = {
+    # Also the sort key for keyset pagination of GET /api/status
+    "status_checks": ["timestamp", "id"],
+    "product_categories": ["asin", "country"],
+    "category_counts": ["country", "category"],
+}
+
+
+async def ensure_indexes(db, retention_seconds: int = 0):
+    """Create the unique key and TTL indexes the cache collections rely on.
+
+    Documents are removed ``retention_seconds`` after expires_at, so the
+    last known data stays available as a fallback while upstream is down.
+
+    Safe to run on every startup: create_index is a no-op when the index
+    already exists, and a changed retention is applied with collMod. A
+    failure on one index (for example duplicate keys left over from before
+    the unique index existed) is logged and does not stop the remaining
+    indexes or the app from starting.
+    """
+    for collection_name, key_fields in CACHE_COLLECTION_KEYS.items():
+        collection = db[collection_name]
+        try:
+            await collection.create_index(
+                [(field, ASCENDING) for field in key_fields],
+                name="_".join(key_fields) + "_unique",
+                unique=True
+            )
+        except PyMongoError as e:
+            logging.error(f"Failed to create unique index on {collection_name}: {str(e)} "
+                          f"(run migrate_dedupe_caches.py to remove duplicates)")
+
+        try:
+            # Mongo's TTL monitor removes documents once the retention past expires_at is over
+            try:
+                await collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=retention_seconds)
+            except OperationFailure:
+                await db.command("collMod", collection_name,
+                                 index={"name": "expires_at_ttl", "expireAfterSeconds": retention_seconds})
+        except PyMongoError as e:
+            logging.error(f"Failed to create TTL index on {collection_name}: {str(e)}")
+
+    for collection_name, key_fields in UNIQUE_KEYS.items():
+        try:
+            await db[collection_name].create_index(
+                [(field, ASCENDING) for field in key_fields],
+                name="_".join(key_fields) + "_unique",
+                unique=True
+            )
+        except PyMongoError as e:
+            logging.error(f"Failed to create unique index on {collection_name}: {str(e)}")
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Tuple
+import base64
+import json
+
+
+def encode_cursor(timestamp: datetime, id: str) -> str:
+    """Opaque cursor for the (timestamp, id) of the last record on a page"""
+    raw = json.dumps([timestamp.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def after_filter(cursor: str) -> dict:
+    """Query matching records strictly after the cursor in (timestamp, id) order"""
+    timestamp, id = decode_cursor(cursor)
+    return {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": id}},
+    ]}
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import json
+import time
+
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory footprint of a cached value, measured as its JSON length"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(part, (bytes, bytearray)) for part in value.values()):
+        # Pre-encoded response bodies
+        return sum(len(part) for part in value.values())
+    return len(json.dumps(value, default=str, separators=(",", ":")))
+
+
+class L1Cache:
+    """Bounded in-process LRU cache with a TTL per entry.
+
+    Sits in front of a MongoDB cache collection. Evicts least recently used
+    entries once either ``max_entries`` or ``max_bytes`` is exceeded. An
+    entry may also carry a shorter freshness TTL; past it, lookup() still
+    returns the value but flags it as stale.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.lookup(key)
+        return entry[0] if entry is not None else None
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[Any, bool]]:
+        """Return (value, stale) for a live entry, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at, _, fresh_until = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        stale = fresh_until <= now
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return value, stale
+
+    def remaining_ttl(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        """(ttl, fresh_ttl) left on a live entry, for caching something derived from it alongside"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, expires_at, _, fresh_until = entry
+        now = time.monotonic()
+        if expires_at <= now:
+            return None
+        return expires_at - now, fresh_until - now
+
+    def set(self, key: Hashable, value: Any, ttl: float, fresh_ttl: Optional[float] = None):
+        if ttl <= 0:
+            return
+        size = approx_size(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        fresh_until = now + (ttl if fresh_ttl is None else min(fresh_ttl, ttl))
+        self._entries[key] = (value, now + ttl, size, fresh_until)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
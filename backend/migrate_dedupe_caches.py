@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""One-off migration: remove duplicate and expired cache documents, then build indexes.
+
+Before cache writes became upserts, product_searches and advanced_searches
+received a new document on every miss. This keeps the document with the
+latest expires_at for each cache key, deletes the others plus anything
+past its retention, and then creates the indexes from db_indexes. Expired
+documents still within CACHE_RETENTION_SECONDS are kept: the server falls
+back to them while PAAPI is unavailable.
+
+Usage (from the backend directory, with the same .env as the server):
+    python migrate_dedupe_caches.py [--dry-run]
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db_indexes import CACHE_COLLECTION_KEYS, DEFAULT_CACHE_RETENTION_SECONDS, ensure_indexes
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+DELETE_BATCH_SIZE = 1000
+
+# Must match the server's, or ensure_indexes would change the TTL index under it
+CACHE_RETENTION_SECONDS = int(os.environ.get('CACHE_RETENTION_SECONDS', str(DEFAULT_CACHE_RETENTION_SECONDS)))
+
+
+async def dedupe_collection(collection, key_fields, dry_run: bool) -> dict:
+    # Same cut-off as the TTL index: expired documents within the retention are fallbacks
+    past_retention = {"expires_at": {"$lte": datetime.utcnow() - timedelta(seconds=CACHE_RETENTION_SECONDS)}}
+    expired = await collection.count_documents(past_retention)
+    if not dry_run:
+        await collection.delete_many(past_retention)
+
+    pipeline = [
+        {"$sort": {"expires_at": -1}},
+        {"$group": {
+            "_id": {field: f"${field}" for field in key_fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+
+    duplicates = []
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        # The first id belongs to the newest document; keep it
+        duplicates.extend(group["ids"][1:])
+
+    if not dry_run:
+        for i in range(0, len(duplicates), DELETE_BATCH_SIZE):
+            await collection.delete_many({"_id": {"$in": duplicates[i:i + DELETE_BATCH_SIZE]}})
+
+    return {"expired": expired, "duplicates": len(duplicates)}
+
+
+async def main(dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        for collection_name, key_fields in CACHE_COLLECTION_KEYS.items():
+            removed = await dedupe_collection(db[collection_name], key_fields, dry_run)
+            action = "Would remove" if dry_run else "Removed"
+            logging.info(f"{collection_name}: {action} {removed['expired']} past retention "
+                         f"and {removed['duplicates']} duplicate documents")
+        if not dry_run:
+            await ensure_indexes(db, CACHE_RETENTION_SECONDS)
+            logging.info("Cache collection indexes are in place")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Dedupe the MongoDB cache collections")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be removed without deleting")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -0,0 +1,256 @@
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional, Tuple
+import random
+import threading
+import time
+import zlib
+
+# Response shapes matching the attributes read from amazon_paapi items
+Item = namedtuple('Item', ['asin', 'item_info', 'images', 'offers', 'customer_reviews'])
+ItemInfo = namedtuple('ItemInfo', ['title'])
+Title = namedtuple('Title', ['display_value'])
+Images = namedtuple('Images', ['primary'])
+Primary = namedtuple('Primary', ['large'])
+Large = namedtuple('Large', ['url'])
+Offers = namedtuple('Offers', ['listings'])
+Listing = namedtuple('Listing', ['price', 'availability'])
+Price = namedtuple('Price', ['amount', 'currency'])
+Availability = namedtuple('Availability', ['message'])
+CustomerReviews = namedtuple('CustomerReviews', ['star_rating', 'count'])
+StarRating = namedtuple('StarRating', ['value'])
+Response = namedtuple('Response', ['items'])
+
+PRODUCT_TEMPLATES = [
+    {"category": "Electronics", "base_price": 50, "titles": ["Bluetooth Headphones", "Wireless Earbuds", "Gaming Mouse", "USB-C Cable", "Phone Case"]},
+    {"category": "Home", "base_price": 25, "titles": ["Coffee Mug", "Throw Pillow", "LED Light Strip", "Plant Pot", "Storage Box"]},
+    {"category": "Beauty", "base_price": 15, "titles": ["Moisturizer", "Face Mask", "Lip Balm", "Nail Polish", "Hair Serum"]},
+    {"category": "Sports", "base_price": 30, "titles": ["Yoga Mat", "Water Bottle", "Resistance Bands", "Running Shoes", "Gym Towel"]},
+    {"category": "Books", "base_price": 12, "titles": ["Self-Help Book", "Cookbook", "Fiction Novel", "Tech Guide", "Art Book"]}
+]
+BRANDS = ["Acme", "Nordic", "Apex", "Lumen", "Vertex", "Harbor", "Summit", "Orbit"]
+VARIANTS = ["Pro", "Lite", "Max", "Mini", "Plus", "Classic", "Eco", "Sport"]
+COLORS = ["Black", "White", "Blue", "Red", "Green", "Grey"]
+AVAILABILITIES = ["In Stock", "Only 3 left", "Limited time", "Prime delivery"]
+CURRENCIES = {"US": "USD", "UK": "GBP", "CA": "CAD"}
+
+# SearchItems returns at most 10 items per page and 10 pages per query
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGES = 10
+
+# Multiplier coprime with 10**8, so every catalog row gets a distinct ASIN
+_ASIN_STRIDE = 48271
+# Multiplier coprime with the number of distinct titles, spreading rows evenly over them
+_TITLE_STRIDE = 7919
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value: int) -> int:
+    """splitmix64 finalizer: a well-spread 64-bit hash of an integer"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class MockUpstreamError(Exception):
+    """Injected PAAPI failure"""
+
+
+class MockCatalog:
+    """Seeded synthetic product catalog, identical for the same size and seed.
+
+    Nothing is stored per product: a row's title, ASIN and offer are all
+    computed from its row number and the seed, so any size up to 10**8
+    takes the same memory. Titles are combinations of a fixed vocabulary;
+    search scores the few thousand distinct titles rather than every row.
+    """
+
+    def __init__(self, size: int = 10000, seed: int = 1):
+        if not 0 < size <= 10 ** 8:
+            raise ValueError(f"Mock catalog size must be between 1 and 10**8: {size}")
+        self.size = size
+        self.seed = seed
+        self.titles = [
+            f"{brand} {title} {variant} - {color}"
+            for template in PRODUCT_TEMPLATES
+            for title in template["titles"]
+            for brand in BRANDS
+            for variant in VARIANTS
+            for color in COLORS
+        ]
+        self.base_prices = [
+            template["base_price"]
+            for template in PRODUCT_TEMPLATES
+            for _ in range(len(template["titles"]) * len(BRANDS) * len(VARIANTS) * len(COLORS))
+        ]
+        self.tokens: Dict[str, List[int]] = {}
+        for title_id, title in enumerate(self.titles):
+            for token in set(self._tokenize(title)):
+                self.tokens.setdefault(token, []).append(title_id)
+        self._salt = _mix(seed)
+        self._title_inverse = pow(_TITLE_STRIDE, -1, len(self.titles))
+        self._asin_inverse = pow(_ASIN_STRIDE, -1, 10 ** 8)
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return [token for token in text.lower().replace("-", " ").split() if token]
+
+    def title_id(self, index: int) -> int:
+        return (index * _TITLE_STRIDE + self.seed) % len(self.titles)
+
+    def rows_with_title(self, title_id: int) -> range:
+        first = (title_id - self.seed) * self._title_inverse % len(self.titles)
+        return range(first, self.size, len(self.titles))
+
+    def row(self, index: int) -> Tuple[str, float, float, int, str]:
+        """(title, price, rating, review count, availability) of one product"""
+        title_id = self.title_id(index)
+        bits = _mix(self._salt ^ index)
+        return (
+            self.titles[title_id],
+            round(self.base_prices[title_id] * (0.8 + 1.7 * (bits & 0xFFFF) / 0xFFFF), 2),
+            (35 + (bits >> 16) % 16) / 10,
+            50 + (bits >> 24) % 4951,
+            AVAILABILITIES[(bits >> 40) % len(AVAILABILITIES)],
+        )
+
+    def asin(self, index: int) -> str:
+        return f"B0{(index * _ASIN_STRIDE + self.seed) % 10 ** 8:08d}"
+
+    def index_of(self, asin: str) -> Optional[int]:
+        """Row number of a catalog ASIN, None for any other ASIN"""
+        if len(asin) != 10 or not asin.startswith("B0") or not asin[2:].isdigit():
+            return None
+        index = (int(asin[2:]) - self.seed) * self._asin_inverse % 10 ** 8
+        return index if index < self.size else None
+
+    def search(self, keywords: str) -> List[int]:
+        """Row indexes answering a query: title matches first, then a filler stable per query"""
+        limit = min(self.size, SEARCH_PAGE_SIZE * SEARCH_MAX_PAGES)
+        scores: Dict[int, int] = {}
+        for token in set(self._tokenize(keywords)):
+            for title_id in self.tokens.get(token, ()):
+                scores[title_id] = scores.get(title_id, 0) + 1
+        matches: List[int] = []
+        for title_id in sorted(scores, key=lambda title_id: (-scores[title_id], title_id)):
+            matches.extend(self.rows_with_title(title_id)[:limit - len(matches)])
+            if len(matches) >= limit:
+                return matches
+        seen = set(matches)
+        index = zlib.crc32(keywords.lower().encode()) % self.size
+        while len(matches) < limit:
+            if index not in seen:
+                matches.append(index)
+                seen.add(index)
+            index = (index + 1) % self.size
+        return matches
+
+
+class MockPAAPI:
+    """Offline stand-in for amazon_paapi.AmazonApi of one region, serving a MockCatalog.
+
+    Each call sleeps ``latency_ms`` (plus or minus up to ``jitter_ms``) and
+    fails with MockUpstreamError at ``error_rate``, drawn from a seeded RNG.
+    The last ``max_items`` response items built are kept for reuse.
+    """
+
+    def __init__(self, catalog: MockCatalog, country: str, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 1, max_items: int = 10000):
+        self.catalog = catalog
+        self.currency = CURRENCIES.get(country, "USD")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(f"{seed}-{country}")
+        self._rng_lock = threading.Lock()
+        self.max_items = max_items
+        self._items: "OrderedDict[int, Item]" = OrderedDict()
+        self._items_lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _item(self, index: int) -> Item:
+        with self._items_lock:
+            item = self._items.get(index)
+            if item is not None:
+                self._items.move_to_end(index)
+                return item
+        title, price, rating, review_count, availability = self.catalog.row(index)
+        item = Item(
+            self.catalog.asin(index),
+            ItemInfo(Title(title)),
+            Images(Primary(Large(f"https://images.unsplash.com/photo-{1500000000 + index}?w=300&h=300&fit=crop"))),
+            Offers([Listing(Price(str(price), self.currency), Availability(availability))]),
+            CustomerReviews(StarRating(str(rating)), review_count),
+        )
+        with self._items_lock:
+            self._items[index] = item
+            if len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return item
+
+    def _simulate_upstream(self, operation: str):
+        with self._rng_lock:
+            self.calls += 1
+            delay = self.latency_ms
+            if self.jitter_ms:
+                delay += self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if failed:
+            raise MockUpstreamError(f"Injected {operation} failure")
+
+    def search_items(self, keywords: str, search_index: str = "All", item_page: int = 1,
+                     item_count: int = SEARCH_PAGE_SIZE) -> Response:
+        self._simulate_upstream("SearchItems")
+        item_count = min(item_count, SEARCH_PAGE_SIZE)
+        start = (item_page - 1) * item_count
+        return Response([self._item(index) for index in self.catalog.search(keywords)[start:start + item_count]])
+
+    def get_items(self, items: List[str]) -> Response:
+        # Unknown ASINs are left out of the response, as PAAPI does
+        self._simulate_upstream("GetItems")
+        indexes = [self.catalog.index_of(asin) for asin in items]
+        return Response([self._item(index) for index in indexes if index is not None])
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "injected_errors": self.errors, "items_cached": len(self._items)}
+
+
+class MockPAAPIBackend:
+    """Builds one MockPAAPI per region over a single shared catalog"""
+
+    def __init__(self, catalog_size: int = 10000, seed: int = 1, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0, item_cache_size: int = 10000):
+        self.catalog_size = catalog_size
+        self.item_cache_size = item_cache_size
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.catalog: Optional[MockCatalog] = None
+        self.clients: Dict[str, MockPAAPI] = {}
+        self._lock = threading.Lock()
+
+    def client(self, country: str) -> MockPAAPI:
+        with self._lock:
+            if self.catalog is None:
+                self.catalog = MockCatalog(self.catalog_size, self.seed)
+            mock = self.clients.get(country)
+            if mock is None:
+                mock = MockPAAPI(self.catalog, country, self.latency_ms, self.jitter_ms, self.error_rate,
+                                 self.seed, self.item_cache_size)
+                self.clients[country] = mock
+            return mock
+
+    def stats(self) -> dict:
+        return {
+            "catalog_size": self.catalog_size,
+            "seed": self.seed,
+            "latency_ms": self.latency_ms,
+            "error_rate": self.error_rate,
+            "regions": {country: mock.stats() for country, mock in self.clients.items()},
+        }
@@ -0,0 +1,128 @@
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterable, List, Optional
+import logging
+
+from categories import CategoryClassifier, get_classifier
+
+
+def _getter(path: str, default=None):
+    """Compile a dotted attribute path into an extractor that never raises AttributeError"""
+    get = attrgetter(path)
+
+    def extract(obj):
+        try:
+            value = get(obj)
+        except AttributeError:
+            return default
+        return default if value is None else value
+
+    return extract
+
+
+# Field extractors, built once at import
+_get_asin = _getter('asin', '')
+_get_title = _getter('item_info.title.display_value', "Unknown")
+_get_image_url = _getter('images.primary.large.url')
+_get_listings = _getter('offers.listings')
+_get_star_rating = _getter('customer_reviews.star_rating.value')
+_get_review_count = _getter('customer_reviews.count')
+_get_availability = _getter('availability.message', "Unknown")
+
+def response_items(response) -> list:
+    if not response or not hasattr(response, 'items') or not response.items:
+        return []
+    return response.items
+
+
+def _price_dict(price_info) -> Optional[dict]:
+    if price_info and hasattr(price_info, 'amount'):
+        return {
+            "amount": float(price_info.amount),
+            "currency": price_info.currency if hasattr(price_info, 'currency') else 'USD'
+        }
+    return None
+
+
+class ProductNormalizer:
+    """Turn PAAPI items into the product dicts served by the API.
+
+    One instance per region: the affiliate URL prefix and partner tag are
+    resolved once, and every item in a response shares one timestamp.
+    """
+
+    def __init__(self, country: str, partner_tag: str, classifier: Optional[CategoryClassifier] = None):
+        self.country = country
+        self.partner_tag = partner_tag
+        self.classifier = classifier or get_classifier()
+        domain = "com" if country == "US" else country.lower()
+        self._url_prefix = f"https://www.amazon.{domain}/dp/"
+        self._url_suffix = f"?tag={partner_tag}"
+
+    def affiliate_url(self, asin: str) -> str:
+        return f"{self._url_prefix}{asin}{self._url_suffix}"
+
+    def normalize(self, items: Iterable, with_category: bool = True, with_availability: bool = False,
+                  timestamp: Optional[str] = None) -> List[dict]:
+        last_updated = timestamp or datetime.utcnow().isoformat()
+        country = self.country
+        products = []
+        for item in items:
+            try:
+                asin = _get_asin(item)
+                title = _get_title(item)
+
+                price_data = None
+                availability = "Unknown"
+                listings = _get_listings(item)
+                if listings:
+                    price_data = _price_dict(listings[0].price)
+                    availability = _get_availability(listings[0])
+
+                star_rating = _get_star_rating(item)
+                review_count = _get_review_count(item)
+
+                product = {
+                    "asin": asin,
+                    "title": title,
+                    "image_url": _get_image_url(item),
+                    "price": price_data,
+                }
+                if with_availability:
+                    product["availability"] = availability
+                product["rating"] = float(star_rating) if star_rating else None
+                product["review_count"] = int(review_count) if review_count is not None else None
+                if with_category:
+                    product["category"] = None
+                product["affiliate_url"] = f"{self._url_prefix}{asin}{self._url_suffix}"
+                product["country"] = country
+                product["last_updated"] = last_updated
+                products.append(product)
+            except Exception as item_error:
+                logging.error(f"Error processing item: {str(item_error)}")
+                continue
+
+        if with_category and products:
+            categories = self.classifier.classify_batch([product["title"] for product in products])
+            for product, category in zip(products, categories):
+                product["category"] = category
+        return products
+
+    def normalize_product(self, item) -> Optional[dict]:
+        """Product detail view of a single item, including availability"""
+        products = self.normalize([item], with_category=False, with_availability=True)
+        return products[0] if products else None
+
+    def normalize_price(self, item, asin: Optional[str] = None) -> Optional[dict]:
+        """Price view of a single item, or None when it has no offers"""
+        listings = _get_listings(item)
+        if not listings:
+            return None
+        price_info = listings[0].price
+        return {
+            "amount": float(price_info.amount) if price_info.amount else None,
+            "currency": price_info.currency if price_info.currency else None,
+            "availability": _get_availability(listings[0]),
+            "last_updated": datetime.utcnow().isoformat(),
+            "affiliate_url": self.affiliate_url(asin or _get_asin(item))
+        }
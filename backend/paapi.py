@@ -0,0 +1,203 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import asyncio
+import functools
+import logging
+import os
+import time
+
+from fastapi import HTTPException
+
+from asin_batcher import AsinBatcher
+from circuit_breaker import CircuitBreaker, UpstreamUnavailable
+from metrics import paapi_errors, paapi_request_duration
+from mock_paapi import MockPAAPI, MockPAAPIBackend
+from normalize import ProductNormalizer
+from rate_limiter import TokenBucketLimiter
+from tracing import span
+
+try:
+    from amazon_paapi import AmazonApi
+    from amazon_paapi.errors import AsinNotFound, InvalidArgument, ItemsNotFound
+    # SDK errors that describe the request, not the health of the upstream
+    NOT_FOUND_ERRORS = (ItemsNotFound,)
+    INVALID_REQUEST_ERRORS = (AsinNotFound, InvalidArgument)
+except ImportError:
+    logging.warning("amazon_paapi not available, Amazon API features will be disabled")
+    AmazonApi = None
+    NOT_FOUND_ERRORS = INVALID_REQUEST_ERRORS = ()
+
+
+# Amazon API Configuration
+PAAPI_MAX_ITEMS_PER_CALL = 10
+
+REGIONAL_CONFIG = {
+    "US": {"host": "webservices.amazon.com", "region": "us-east-1", "tag_suffix": "-20"},
+    "UK": {"host": "webservices.amazon.co.uk", "region": "eu-west-1", "tag_suffix": "-21"},
+    "CA": {"host": "webservices.amazon.ca", "region": "us-east-1", "tag_suffix": "-20"}
+}
+
+class PAAPIClient:
+    def __init__(self, country: str, executor: Optional[ThreadPoolExecutor] = None,
+                 limiter: Optional[TokenBucketLimiter] = None, breaker: Optional[CircuitBreaker] = None,
+                 backend: Optional[MockPAAPI] = None):
+        if backend is None and not AmazonApi:
+            raise HTTPException(status_code=503, detail="Amazon API not available")
+        
+        config = REGIONAL_CONFIG[country]
+        access_key = os.environ['PAAPI_ACCESS_KEY']
+        secret_key = os.environ['PAAPI_SECRET_KEY']
+        
+        # Get the base partner tag without any suffix
+        base_partner_tag = os.environ['PARTNER_TAG']
+        if "-" in base_partner_tag:
+            base_partner_tag = base_partner_tag.split("-")[0]
+        
+        # Add the correct suffix for the region
+        partner_tag = f"{base_partner_tag}{config['tag_suffix']}"
+        
+        logging.info(f"Initializing PAAPIClient with country={country}, access_key={access_key[:4]}..., partner_tag={partner_tag}")
+        
+        if backend is not None:
+            logging.info("Using mock implementation for PAAPIClient")
+            self.client = backend
+        else:
+            # Request pacing is left to the limiter passed in
+            self.client = AmazonApi(access_key, secret_key, partner_tag, country, throttling=0)
+        
+        self.country = country
+        self.partner_tag = partner_tag
+        self.executor = executor
+        self.limiter = limiter
+        self.breaker = breaker or CircuitBreaker(country)
+        self.normalizer = ProductNormalizer(country, partner_tag)
+
+    async def _run_blocking(self, operation: str, func, *args):
+        # The PAAPI SDK is synchronous; run it off the event loop so one slow
+        # upstream call does not stall every other request on the worker
+        if not self.breaker.allow(probe=False):
+            raise UpstreamUnavailable(self.country, "circuit open")
+        if self.limiter:
+            with span("paapi_wait"):
+                await self.limiter.acquire()
+        # Claim a half-open probe only once the call holds a token, so a call
+        # rejected or cancelled while queued never blocks the region
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.country, "circuit open")
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            with span("paapi"):
+                result = await loop.run_in_executor(self.executor, functools.partial(func, *args))
+        except asyncio.CancelledError:
+            # The caller went away; the outcome says nothing about upstream health
+            self.breaker.release()
+            raise
+        except NOT_FOUND_ERRORS:
+            # The SDK raises instead of returning an empty search or GetItems response
+            paapi_request_duration.observe(time.perf_counter() - start, self.country, operation)
+            self.breaker.record_success()
+            return None
+        except INVALID_REQUEST_ERRORS as e:
+            paapi_request_duration.observe(time.perf_counter() - start, self.country, operation)
+            self.breaker.release()
+            raise HTTPException(status_code=400, detail=str(e)) from e
+        except Exception as e:
+            paapi_request_duration.observe(time.perf_counter() - start, self.country, operation)
+            paapi_errors.inc(self.country, operation)
+            self.breaker.record_failure()
+            raise UpstreamUnavailable(self.country, str(e)) from e
+        paapi_request_duration.observe(time.perf_counter() - start, self.country, operation)
+        self.breaker.record_success()
+        return result
+
+    async def search_products_async(self, keywords: str, page: int = 1, filters: dict = None):
+        return await self._run_blocking("SearchItems", self.search_products, keywords, page, filters)
+
+    async def get_items_async(self, asins: List[str]):
+        return await self._run_blocking("GetItems", self.get_items, asins)
+    
+    def search_products(self, keywords: str, page: int = 1, filters: dict = None):
+        try:
+            return self.client.search_items(
+                keywords=keywords,
+                search_index="All",
+                item_page=page
+            )
+        except Exception as e:
+            logging.error(f"PAAPI search error: {str(e)}")
+            raise
+    
+    def get_items(self, asins: List[str]):
+        # GetItems accepts up to PAAPI_MAX_ITEMS_PER_CALL ASINs per request
+        try:
+            return self.client.get_items(items=asins)
+        except Exception as e:
+            logging.error(f"PAAPI get item error: {str(e)}")
+            raise
+
+
+class PAAPIClientRegistry:
+    """One long-lived PAAPIClient per REGIONAL_CONFIG region sharing a bounded thread pool.
+
+    Each region's upstream calls pass through its own circuit breaker and
+    its own token bucket of ``tps`` calls per second, matching PAAPI's
+    per-account TPS limits. With ``mock`` set, clients serve its synthetic
+    catalog instead of calling Amazon.
+    """
+
+    def __init__(self, max_workers: int = 8, batch_window: float = 0.005, batch_size: int = PAAPI_MAX_ITEMS_PER_CALL,
+                 tps: float = 1.0, burst: int = 1, max_queue: int = 100,
+                 max_wait: float = 5.0, background_max_wait: float = 60.0,
+                 breaker_failures: int = 5, breaker_reset: float = 30.0, mock: Optional[MockPAAPIBackend] = None):
+        self.max_workers = max_workers
+        self.batch_window = batch_window
+        self.batch_size = min(batch_size, PAAPI_MAX_ITEMS_PER_CALL)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.clients: Dict[str, PAAPIClient] = {}
+        self.batchers: Dict[str, AsinBatcher] = {}
+        self.limiters: Dict[str, TokenBucketLimiter] = {
+            country: TokenBucketLimiter(country, tps, burst, max_queue, max_wait, background_max_wait)
+            for country in REGIONAL_CONFIG
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {
+            country: CircuitBreaker(country, breaker_failures, breaker_reset) for country in REGIONAL_CONFIG
+        }
+        self.mock = mock
+
+    def start(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="paapi")
+        for country in REGIONAL_CONFIG:
+            try:
+                self.clients[country] = self._build(country)
+            except Exception as e:
+                # Leave the region unset; get() retries and surfaces the error per request
+                logging.warning(f"PAAPIClient for {country} not initialized at startup: {str(e)}")
+
+    def get(self, country: str) -> PAAPIClient:
+        if country not in REGIONAL_CONFIG:
+            raise HTTPException(status_code=400, detail=f"Unsupported country: {country}")
+        paapi_client = self.clients.get(country)
+        if paapi_client is None:
+            paapi_client = self._build(country)
+            self.clients[country] = paapi_client
+        return paapi_client
+
+    def _build(self, country: str) -> PAAPIClient:
+        backend = self.mock.client(country) if self.mock else None
+        return PAAPIClient(country, self.executor, self.limiters[country], self.breakers[country], backend)
+
+    def batcher(self, country: str) -> AsinBatcher:
+        """Per-region batcher that folds concurrent ASIN lookups into one GetItems call"""
+        batcher = self.batchers.get(country)
+        if batcher is None:
+            batcher = AsinBatcher(self.get(country), self.batch_window, self.batch_size)
+            self.batchers[country] = batcher
+        return batcher
+
+    def shutdown(self):
+        self.batchers.clear()
+        self.clients.clear()
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
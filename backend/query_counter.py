@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Dict, Optional
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+
+class QueryCounterBuffer:
+    """Write-behind aggregator for search-query popularity counters.
+
+    Increments are merged per normalized query in memory and written to
+    Mongo as one unordered bulk_write every ``flush_interval`` seconds, so
+    the request path never waits on the popularity update.
+    """
+
+    def __init__(self, collection, flush_interval: float = 5.0):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, int] = {}
+        self._last_used: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.increments = 0
+        self.flushes = 0
+        self.written = 0
+        self.errors = 0
+
+    def increment(self, query: str, by: int = 1):
+        query = query.lower()
+        self._pending[query] = self._pending.get(query, 0) + by
+        self._last_used[query] = datetime.utcnow()
+        self.increments += 1
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            last_used, self._last_used = self._last_used, {}
+            operations = [
+                UpdateOne(
+                    {"query": query},
+                    {"$inc": {"count": count}, "$set": {"last_used": last_used[query]}},
+                    upsert=True
+                )
+                for query, count in pending.items()
+            ]
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                # Put the counts back so the next flush retries them
+                self.errors += 1
+                logging.error(f"Failed to flush {len(operations)} search query counters: {str(e)}")
+                for query, count in pending.items():
+                    self._pending[query] = self._pending.get(query, 0) + count
+                    self._last_used.setdefault(query, last_used[query])
+                return
+            self.flushes += 1
+            self.written += len(operations)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # stop() cancels this loop; a flush already under way runs to the end,
+            # and the final flush in stop() waits for it on the lock
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "increments": self.increments,
+            "flushes": self.flushes,
+            "written": self.written,
+            "errors": self.errors,
+        }
@@ -0,0 +1,153 @@
+from contextvars import ContextVar
+from typing import List, Optional
+import asyncio
+import heapq
+import itertools
+import time
+
+from circuit_breaker import UpstreamUnavailable
+
+
+# Upstream call priorities; lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# Share of max_wait an admitted caller may expect to wait; the rest absorbs
+# drain timing, so a caller is not admitted only to time out at the deadline
+ADMISSION_MARGIN = 0.9
+
+# Priority of upstream calls made from the current task. Background work
+# (stale refreshes, scheduled warming) sets BACKGROUND in its own task.
+upstream_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+class TokenBucketLimiter:
+    """Token bucket for one region's upstream calls, with a priority queue in front.
+
+    Allows ``rate`` calls per second with bursts of up to ``burst``. Callers
+    that find the bucket empty wait in a queue ordered by priority, then
+    arrival, so interactive requests overtake queued background refreshes.
+    Once ``max_queue`` callers are waiting, new ones are rejected with 503.
+    A queued caller gives up with 503 after ``max_wait`` seconds
+    (``background_max_wait`` for background calls), and is rejected at once
+    when the wait expected for the callers ahead of it reaches
+    ``ADMISSION_MARGIN`` of that.
+    A ``rate`` of 0 or less disables limiting.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1, max_queue: int = 100,
+                 max_wait: float = 5.0, background_max_wait: float = 60.0):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_queue = max_queue
+        self.max_wait = {INTERACTIVE: max_wait, BACKGROUND: background_max_wait}
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._drain_task: Optional[asyncio.Task] = None
+        self.acquired = {priority: 0 for priority in PRIORITY_NAMES}
+        self.waited = {priority: 0 for priority in PRIORITY_NAMES}
+        self.wait_seconds = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.max_wait_seconds = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.timeouts = {priority: 0 for priority in PRIORITY_NAMES}
+        self.rejected = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, priority: Optional[int] = None):
+        if priority is None:
+            priority = upstream_priority.get()
+        if self.rate <= 0:
+            self.acquired[priority] += 1
+            return
+
+        self._refill()
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+            self.acquired[priority] += 1
+            return
+
+        if self.queue_depth() >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "rate limit queue full")
+        # Callers of the same or a more urgent priority are served first
+        ahead = sum(1 for waiter_priority, _, future in self._waiters
+                    if not future.done() and waiter_priority <= priority)
+        max_wait = self.max_wait[priority]
+        if (ahead + 1 - self._tokens) / self.rate >= max_wait * ADMISSION_MARGIN:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "rate limit wait too long")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._seq), future])
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.ensure_future(self._drain())
+
+        started = time.monotonic()
+        try:
+            # On timeout the future is cancelled, and the drain loop skips it
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            self.timeouts[priority] += 1
+            raise UpstreamUnavailable(self.name, "rate limit wait exceeded")
+        waited = time.monotonic() - started
+        self.acquired[priority] += 1
+        self.waited[priority] += 1
+        self.wait_seconds[priority] += waited
+        self.max_wait_seconds[priority] = max(self.max_wait_seconds[priority], waited)
+
+    async def _drain(self):
+        # Hand out tokens to queued callers as they accrue, best priority first
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # The caller was cancelled while queued
+                continue
+            self._tokens -= 1
+            future.set_result(None)
+
+    def fan_out(self, priority: Optional[int] = None) -> Optional[int]:
+        """Calls one caller can have waiting at once and still expect each to be admitted; None if unlimited"""
+        if priority is None:
+            priority = upstream_priority.get()
+        if self.rate <= 0:
+            return None
+        budget = int(self.rate * self.max_wait[priority] * ADMISSION_MARGIN) - self.queue_depth()
+        return max(1, budget)
+
+    def queue_depth(self, priority: Optional[int] = None) -> int:
+        return sum(
+            1 for waiter_priority, _, future in self._waiters
+            if not future.done() and (priority is None or waiter_priority == priority)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "queue_depth": self.queue_depth(),
+            "rejected": self.rejected,
+            "priorities": {
+                name: {
+                    "queued": self.queue_depth(priority),
+                    "acquired": self.acquired[priority],
+                    "waited": self.waited[priority],
+                    "avg_wait_ms": round(self.wait_seconds[priority] / self.waited[priority] * 1000, 2)
+                    if self.waited[priority] else 0.0,
+                    "max_wait_ms": round(self.max_wait_seconds[priority] * 1000, 2),
+                    "timeouts": self.timeouts[priority],
+                }
+                for priority, name in PRIORITY_NAMES.items()
+            },
+        }
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import heapq
+import logging
+
+from cache_tier import CacheTier
+from circuit_breaker import UpstreamUnavailable
+from rate_limiter import BACKGROUND, upstream_priority
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class _Tracked:
+    __slots__ = ("count", "region", "loader")
+
+    def __init__(self, region: str, loader: Loader):
+        self.count = 0
+        self.region = region
+        self.loader = loader
+
+
+class RefreshScheduler:
+    """Keeps the most requested cache entries warm ahead of their soft TTL.
+
+    Every access is counted per tier and key. Each ``interval`` seconds the
+    ``top_n`` hottest keys of each tier that stop being fresh within
+    ``lead_time`` seconds are reloaded, hottest first, spending at most
+    ``budget_per_region`` upstream loads per region. Counts then halve, so
+    the hot set follows recent traffic. ``lead_time`` should exceed
+    ``interval`` or entries can go stale between two cycles.
+    """
+
+    def __init__(self, interval: float = 30.0, top_n: int = 100, lead_time: float = 60.0,
+                 budget_per_region: int = 50, max_tracked: int = 10000):
+        self.interval = interval
+        self.top_n = top_n
+        self.lead_time = timedelta(seconds=lead_time)
+        self.budget_per_region = budget_per_region
+        self.max_tracked = max_tracked
+        self._tiers: Dict[str, CacheTier] = {}
+        self._tracked: Dict[str, Dict[Tuple, _Tracked]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.cycles = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.over_budget = 0
+
+    def track(self, tier: CacheTier, key: Tuple, region: str, loader: Loader):
+        """Count one access to ``key``; ``loader`` reloads it from upstream"""
+        entries = self._tracked.get(tier.name)
+        if entries is None:
+            self._tiers[tier.name] = tier
+            entries = self._tracked[tier.name] = {}
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = _Tracked(region, loader)
+        entry.count += 1
+
+    async def run_once(self):
+        candidates = []
+        for name, entries in self._tracked.items():
+            tier = self._tiers[name]
+            hottest = heapq.nlargest(self.top_n, entries.items(), key=lambda item: item[1].count)
+            due = await tier.due_for_refresh([key for key, _ in hottest], self.lead_time)
+            candidates.extend((entry.count, tier, key, entry) for key, entry in hottest if key in due)
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        spent: Dict[str, int] = {}
+        refreshes = []
+        for _, tier, key, entry in candidates:
+            if spent.get(entry.region, 0) >= self.budget_per_region:
+                self.over_budget += 1
+                continue
+            spent[entry.region] = spent.get(entry.region, 0) + 1
+            refreshes.append(self._refresh(tier, key, entry))
+        await asyncio.gather(*refreshes)
+
+        self._decay()
+        self.cycles += 1
+
+    async def _refresh(self, tier: CacheTier, key: Tuple, entry: _Tracked):
+        # gather() runs each refresh in its own task, so this stays local to it
+        upstream_priority.set(BACKGROUND)
+        try:
+            await tier.fetch(key, entry.loader)
+            self.refreshed += 1
+        except UpstreamUnavailable as e:
+            # Keep tracking the key; it is still wanted once upstream recovers
+            self.errors += 1
+            logging.warning(f"Scheduled refresh of {tier.name} {tier.flight_key(key)} skipped: {e.detail}")
+        except Exception as e:
+            # Stop spending budget on a key that no longer loads
+            self.errors += 1
+            self._tracked[tier.name].pop(key, None)
+            logging.warning(f"Scheduled refresh of {tier.name} {tier.flight_key(key)} failed: {str(e)}")
+
+    def _decay(self):
+        for name, entries in self._tracked.items():
+            for key in list(entries):
+                entries[key].count >>= 1
+                if not entries[key].count:
+                    del entries[key]
+            if len(entries) > self.max_tracked:
+                self._tracked[name] = dict(
+                    heapq.nlargest(self.max_tracked, entries.items(), key=lambda item: item[1].count)
+                )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Refresh cycle failed: {str(e)}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "tracked": {name: len(entries) for name, entries in self._tracked.items()},
+            "cycles": self.cycles,
+            "refreshed": self.refreshed,
+            "errors": self.errors,
+            "over_budget": self.over_budget,
+        }
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Optional, Tuple
+import gzip
+import json
+import logging
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:
+    logging.warning("orjson not available, falling back to json for pre-encoded responses")
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(value: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+def available_encodings(requested: List[str]) -> List[str]:
+    """The requested content codings this process can produce, in preference order"""
+    supported = ["br", "gzip"] if brotli else ["gzip"]
+    return [encoding for encoding in supported if encoding in requested]
+
+
+def compress(body: bytes, encodings: List[str]) -> Dict[str, bytes]:
+    variants = {}
+    if len(body) < MIN_COMPRESS_BYTES:
+        return variants
+    if "br" in encodings and brotli:
+        variants["br"] = brotli.compress(body, quality=5)
+    if "gzip" in encodings:
+        variants["gzip"] = gzip.compress(body, compresslevel=6)
+    return variants
+
+
+def encoding_qualities(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Quality value of each coding in an Accept-Encoding header; a malformed q counts as a refusal"""
+    qualities = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_variant(variants: Dict[str, bytes], accept_encoding: Optional[str]) -> Tuple[Optional[str], Optional[bytes]]:
+    """Best stored compressed variant for the client, or (None, None) for identity"""
+    qualities = encoding_qualities(accept_encoding)
+    for encoding in ("br", "gzip"):
+        # A coding named explicitly, even with q=0, overrides the "*" wildcard
+        if encoding in variants and qualities.get(encoding, qualities.get("*", 0.0)) > 0:
+            return encoding, variants[encoding]
+    return None, None
+
+
+def json_response(body: bytes, encoding: Optional[str] = None) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -8,12 +9,28 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
+import asyncio
+import json
 from datetime import datetime, timedelta
-try:
-    from amazon_paapi import AmazonApi
-except ImportError:
-    logging.warning("amazon_paapi not available, Amazon API features will be disabled")
-    AmazonApi = None
+
+from asin_batcher import normalize_asin
+from cache_tier import CacheTier
+from category_counts import CategoryCounts
+from compact_results import decode_results, encode_results
+from circuit_breaker import UpstreamUnavailable
+from coalesce import SingleFlight
+from db_indexes import DEFAULT_CACHE_RETENTION_SECONDS, ensure_indexes
+from keyset import after_filter, encode_cursor
+from metrics import MetricsMiddleware, MongoCommandMetrics, registry as metrics_registry
+from l1_cache import L1Cache
+from mock_paapi import MockPAAPIBackend
+from normalize import response_items
+from paapi import REGIONAL_CONFIG, PAAPIClientRegistry
+from query_counter import QueryCounterBuffer
+from refresh_scheduler import RefreshScheduler
+from response_bodies import available_encodings, choose_variant, compress, dumps, json_response
+from suggestions import MAX_QUERY_LENGTH, SuggestionIndex
+from tracing import SlowRequestLog, TracingMiddleware, span
 
 
 ROOT_DIR = Path(__file__).parent
@@ -21,171 +38,135 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
-# Amazon API Configuration
-REGIONAL_CONFIG = {
-    "US": {"host": "webservices.amazon.com", "region": "us-east-1", "tag_suffix": "-20"},
-    "UK": {"host": "webservices.amazon.co.uk", "region": "eu-west-1", "tag_suffix": "-21"},
-    "CA": {"host": "webservices.amazon.ca", "region": "us-east-1", "tag_suffix": "-20"}
-}
-
-class PAAPIClient:
-    def __init__(self, country: str):
-        if not AmazonApi:
-            raise HTTPException(status_code=503, detail="Amazon API not available")
-        
-        config = REGIONAL_CONFIG[country]
-        access_key = os.environ['PAAPI_ACCESS_KEY']
-        secret_key = os.environ['PAAPI_SECRET_KEY']
-        
-        # Get the base partner tag without any suffix
-        base_partner_tag = os.environ['PARTNER_TAG']
-        if "-" in base_partner_tag:
-            base_partner_tag = base_partner_tag.split("-")[0]
-        
-        # Add the correct suffix for the region
-        partner_tag = f"{base_partner_tag}{config['tag_suffix']}"
-        
-        logging.info(f"Initializing PAAPIClient with country={country}, access_key={access_key[:4]}..., partner_tag={partner_tag}")
-        
-        # For testing purposes, we'll use a mock implementation
-        logging.info("Using mock implementation for PAAPIClient")
-        self.client = None
-        
-        self.country = country
-        self.partner_tag = partner_tag
-    
-    def search_products(self, keywords: str, page: int = 1, filters: dict = None):
-        try:
-            if self.client:
-                return self.client.search_items(
-                    keywords=keywords,
-                    search_index="All",
-                    item_page=page
-                )
-            else:
-                # Enhanced mock implementation for testing with more variety
-                logging.info("Using enhanced mock implementation for search_products")
-                from collections import namedtuple
-                import random
-                
-                Item = namedtuple('Item', ['asin', 'item_info', 'images', 'offers', 'customer_reviews'])
-                ItemInfo = namedtuple('ItemInfo', ['title'])
-                Title = namedtuple('Title', ['display_value'])
-                Images = namedtuple('Images', ['primary'])
-                Primary = namedtuple('Primary', ['large'])
-                Large = namedtuple('Large', ['url'])
-                Offers = namedtuple('Offers', ['listings'])
-                Listing = namedtuple('Listing', ['price', 'availability'])
-                Price = namedtuple('Price', ['amount', 'currency'])
-                Availability = namedtuple('Availability', ['message'])
-                CustomerReviews = namedtuple('CustomerReviews', ['star_rating', 'count'])
-                StarRating = namedtuple('StarRating', ['value'])
-                
-                Response = namedtuple('Response', ['items'])
-                
-                # More diverse product categories and data
-                product_templates = [
-                    {"category": "Electronics", "base_price": 50, "titles": ["Bluetooth Headphones", "Wireless Earbuds", "Gaming Mouse", "USB-C Cable", "Phone Case"]},
-                    {"category": "Home", "base_price": 25, "titles": ["Coffee Mug", "Throw Pillow", "LED Light Strip", "Plant Pot", "Storage Box"]},
-                    {"category": "Beauty", "base_price": 15, "titles": ["Moisturizer", "Face Mask", "Lip Balm", "Nail Polish", "Hair Serum"]},
-                    {"category": "Sports", "base_price": 30, "titles": ["Yoga Mat", "Water Bottle", "Resistance Bands", "Running Shoes", "Gym Towel"]},
-                    {"category": "Books", "base_price": 12, "titles": ["Self-Help Book", "Cookbook", "Fiction Novel", "Tech Guide", "Art Book"]}
-                ]
-                
-                # Create mock items with variety
-                items = []
-                for i in range(15):  # More products for better filtering
-                    template = random.choice(product_templates)
-                    title_base = random.choice(template["titles"])
-                    
-                    # Add search query relevance
-                    if keywords.lower() in title_base.lower():
-                        title = Title(f"{title_base} Pro {i+1}")
-                    else:
-                        title = Title(f"{title_base} {keywords.title()} Edition")
-                    
-                    item_info = ItemInfo(title)
-                    
-                    # Varied images
-                    large = Large(f"https://images.unsplash.com/photo-{1500000000 + i}?w=300&h=300&fit=crop")
-                    primary = Primary(large)
-                    images = Images(primary)
-                    
-                    # Varied pricing
-                    base_price = template["base_price"]
-                    price_variation = random.uniform(0.8, 2.5)
-                    final_price = round(base_price * price_variation, 2)
-                    price = Price(str(final_price), "USD")
-                    
-                    # Varied availability
-                    availabilities = ["In Stock", "Only 3 left", "Limited time", "Prime delivery"]
-                    availability = Availability(random.choice(availabilities))
-                    listing = Listing(price, availability)
-                    offers = Offers([listing])
-                    
-                    # Varied ratings
-                    rating_value = round(random.uniform(3.5, 5.0), 1)
-                    review_count = random.randint(50, 500)
-                    star_rating = StarRating(str(rating_value))
-                    customer_reviews = CustomerReviews(star_rating, review_count)
-                    
-                    item = Item(f"B{random.randint(10000000, 99999999)}", item_info, images, offers, customer_reviews)
-                    items.append(item)
-                
-                return Response(items)
-        except Exception as e:
-            logging.error(f"PAAPI search error: {str(e)}")
-            return None
-    
-    def get_product_details(self, asin: str):
-        try:
-            if self.client:
-                return self.client.get_items(items=[asin])
-            else:
-                # Mock implementation for testing
-                logging.info("Using mock implementation for get_product_details")
-                from collections import namedtuple
-                
-                Item = namedtuple('Item', ['asin', 'item_info', 'images', 'offers', 'customer_reviews'])
-                ItemInfo = namedtuple('ItemInfo', ['title'])
-                Title = namedtuple('Title', ['display_value'])
-                Images = namedtuple('Images', ['primary'])
-                Primary = namedtuple('Primary', ['large'])
-                Large = namedtuple('Large', ['url'])
-                Offers = namedtuple('Offers', ['listings'])
-                Listing = namedtuple('Listing', ['price', 'availability'])
-                Price = namedtuple('Price', ['amount', 'currency'])
-                Availability = namedtuple('Availability', ['message'])
-                CustomerReviews = namedtuple('CustomerReviews', ['star_rating', 'count'])
-                StarRating = namedtuple('StarRating', ['value'])
-                
-                Response = namedtuple('Response', ['items'])
-                
-                # Create mock item
-                title = Title(f"Bluetooth Headphones {asin}")
-                item_info = ItemInfo(title)
-                
-                large = Large(f"https://example.com/image-{asin}.jpg")
-                primary = Primary(large)
-                images = Images(primary)
-                
-                price = Price("59.99", "USD")
-                availability = Availability("In Stock")
-                listing = Listing(price, availability)
-                offers = Offers([listing])
-                
-                star_rating = StarRating("4.5")
-                customer_reviews = CustomerReviews(star_rating, 250)
-                
-                item = Item(asin, item_info, images, offers, customer_reviews)
-                
-                return Response([item])
-        except Exception as e:
-            logging.error(f"PAAPI get item error: {str(e)}")
-            return None
+# PAAPI_BACKEND=mock (the default) serves a seeded synthetic catalog instead of
+# calling Amazon, with optional injected latency and errors for load tests
+mock_paapi = MockPAAPIBackend(
+    catalog_size=int(os.environ.get('PAAPI_MOCK_CATALOG_SIZE', '10000')),
+    seed=int(os.environ.get('PAAPI_MOCK_SEED', '1')),
+    latency_ms=float(os.environ.get('PAAPI_MOCK_LATENCY_MS', '0')),
+    jitter_ms=float(os.environ.get('PAAPI_MOCK_JITTER_MS', '0')),
+    error_rate=float(os.environ.get('PAAPI_MOCK_ERROR_RATE', '0')),
+    item_cache_size=int(os.environ.get('PAAPI_MOCK_ITEM_CACHE_SIZE', '10000'))
+) if os.environ.get('PAAPI_BACKEND', 'mock') == 'mock' else None
+
+# Amazon PAAPI clients, one per region, built once at startup
+paapi_clients = PAAPIClientRegistry(
+    max_workers=int(os.environ.get('PAAPI_MAX_WORKERS', '8')),
+    batch_window=float(os.environ.get('PAAPI_BATCH_WINDOW_MS', '5')) / 1000,
+    batch_size=int(os.environ.get('PAAPI_BATCH_SIZE', '10')),
+    tps=float(os.environ.get('PAAPI_TPS', '1')),
+    burst=int(os.environ.get('PAAPI_BURST', '1')),
+    max_queue=int(os.environ.get('PAAPI_MAX_QUEUE', '100')),
+    max_wait=float(os.environ.get('PAAPI_MAX_WAIT_SECONDS', '5')),
+    background_max_wait=float(os.environ.get('PAAPI_BACKGROUND_MAX_WAIT_SECONDS', '60')),
+    breaker_failures=int(os.environ.get('PAAPI_BREAKER_FAILURES', '5')),
+    breaker_reset=float(os.environ.get('PAAPI_BREAKER_RESET_SECONDS', '30')),
+    mock=mock_paapi
+)
+
+# Cache lifetimes shared by the MongoDB collections and the in-process L1 tier.
+# Entries are fresh until the soft TTL (1h search, 30min product, 5min price)
+# and served stale, while refreshed in the background, until the hard TTL.
+SEARCH_CACHE_TTL = timedelta(hours=1)
+PRODUCT_CACHE_TTL = timedelta(minutes=30)
+PRICE_CACHE_TTL = timedelta(minutes=5)
+SEARCH_CACHE_HARD_TTL = timedelta(seconds=int(os.environ.get('SEARCH_CACHE_HARD_TTL_SECONDS', str(6 * 3600))))
+PRODUCT_CACHE_HARD_TTL = timedelta(seconds=int(os.environ.get('PRODUCT_CACHE_HARD_TTL_SECONDS', str(6 * 3600))))
+PRICE_CACHE_HARD_TTL = timedelta(seconds=int(os.environ.get('PRICE_CACHE_HARD_TTL_SECONDS', str(30 * 60))))
+# 404s and empty results are remembered briefly; expired documents are kept
+# this long past the hard TTL as a fallback while PAAPI is unavailable
+NEGATIVE_CACHE_TTL = timedelta(seconds=int(os.environ.get('NEGATIVE_CACHE_TTL_SECONDS', '60')))
+CACHE_RETENTION_SECONDS = int(os.environ.get('CACHE_RETENTION_SECONDS', str(DEFAULT_CACHE_RETENTION_SECONDS)))
+
+# In-process L1 caches in front of the MongoDB cache collections
+L1_MAX_ENTRIES = int(os.environ.get('L1_CACHE_MAX_ENTRIES', '1024'))
+L1_MAX_BYTES = int(os.environ.get('L1_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Per-country category counts, updated as products are cached and reconciled periodically
+category_counts = CategoryCounts(
+    db.product_categories,
+    db.category_counts,
+    reconcile_interval=float(os.environ.get('CATEGORY_RECONCILE_SECONDS', '3600'))
+)
+
+async def _count_search_categories(result_sets: List[List[dict]]):
+    await category_counts.record(product for products in result_sets for product in products)
+
+# Search results held in L1 are served as pre-encoded JSON, compressed with these codings when available
+RESPONSE_ENCODINGS = available_encodings(os.environ.get('RESPONSE_COMPRESSION', 'br,gzip').split(','))
+
+def _encode_search_body(products: List[dict]) -> dict:
+    products_json = dumps(products)
+    body = {"json": products_json}
+    body.update(compress(_search_body(products_json, cached=True, stale=False), RESPONSE_ENCODINGS))
+    return body
+
+def _search_body(products_json: bytes, cached: bool, stale: bool) -> bytes:
+    return (b'{"products":' + products_json + b',"cached":' + (b'true' if cached else b'false')
+            + b',"stale":' + (b'true' if stale else b'false') + b'}')
+
+# Storage format of new search cache documents (see compact_results.py). Readers
+# accept both, but workers from before format 2 read results as a plain list:
+# set SEARCH_CACHE_FORMAT=2 only once every worker runs this version
+SEARCH_CACHE_FORMAT = int(os.environ.get('SEARCH_CACHE_FORMAT', '1'))
+
+# Each cached resource: L1 over its collection, with concurrent misses coalesced
+search_results = CacheTier(
+    "product_searches", db.product_searches, ["cache_key"], "results",
+    SEARCH_CACHE_TTL, SEARCH_CACHE_HARD_TTL,
+    L1Cache("product_searches", L1_MAX_ENTRIES, L1_MAX_BYTES), SingleFlight("product_searches"),
+    NEGATIVE_CACHE_TTL, on_store=_count_search_categories, body_encoder=_encode_search_body,
+    encode=encode_results if SEARCH_CACHE_FORMAT >= 2 else None, decode=decode_results
+)
+product_details = CacheTier(
+    "products", db.products, ["asin", "country"], "data",
+    PRODUCT_CACHE_TTL, PRODUCT_CACHE_HARD_TTL,
+    L1Cache("products", L1_MAX_ENTRIES, L1_MAX_BYTES), SingleFlight("products"),
+    NEGATIVE_CACHE_TTL, on_store=category_counts.record
+)
+product_prices = CacheTier(
+    "prices", db.prices, ["asin", "country"], "price_data",
+    PRICE_CACHE_TTL, PRICE_CACHE_HARD_TTL,
+    L1Cache("prices", L1_MAX_ENTRIES, L1_MAX_BYTES), SingleFlight("prices"),
+    NEGATIVE_CACHE_TTL
+)
+CACHE_TIERS = (search_results, product_details, product_prices)
+
+# Page size bounds for GET /status
+STATUS_PAGE_DEFAULT = 100
+STATUS_PAGE_MAX = 1000
+
+# PAAPI SearchItems serves at most 10 pages per query
+MAX_SEARCH_PAGES = 10
+
+# Upper bound on ASINs accepted by the batch endpoints
+MAX_BATCH_ASINS = int(os.environ.get('MAX_BATCH_ASINS', '100'))
+
+# Autocomplete and related-search indexes over db.search_queries, built at startup;
+# both stay within these bounds as new queries arrive, evicting the lowest counts
+SUGGESTION_INDEX_MAX_QUERIES = int(os.environ.get('SUGGESTION_INDEX_MAX_QUERIES', '100000'))
+SUGGESTION_INDEX_MAX_NODES = int(os.environ.get('SUGGESTION_INDEX_MAX_NODES', '1000000'))
+suggestion_index = SuggestionIndex(top_k=10, max_queries=SUGGESTION_INDEX_MAX_QUERIES,
+                                   max_nodes=SUGGESTION_INDEX_MAX_NODES)
+related_query_index = SuggestionIndex(top_k=10, index_words=True, max_queries=SUGGESTION_INDEX_MAX_QUERIES,
+                                      max_nodes=SUGGESTION_INDEX_MAX_NODES)
+
+# Popularity counters are buffered in memory and flushed to db.search_queries in bulk
+query_counter = QueryCounterBuffer(
+    db.search_queries,
+    flush_interval=float(os.environ.get('QUERY_COUNTER_FLUSH_SECONDS', '5'))
+)
+
+# Hot cache entries are reloaded shortly before they go stale, within a per-region budget
+refresh_scheduler = RefreshScheduler(
+    interval=float(os.environ.get('REFRESH_INTERVAL_SECONDS', '30')),
+    top_n=int(os.environ.get('REFRESH_TOP_N', '100')),
+    lead_time=float(os.environ.get('REFRESH_LEAD_SECONDS', '60')),
+    budget_per_region=int(os.environ.get('REFRESH_BUDGET_PER_REGION', '50'))
+)
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -208,6 +189,15 @@ class ProductSearchRequest(BaseModel):
     country: str = "US"
     page: int = 1
 
+class ProductBatchRequest(BaseModel):
+    asins: List[str]
+    country: str = "US"
+
+class MultiRegionSearchRequest(BaseModel):
+    query: str
+    countries: List[str] = Field(default_factory=lambda: list(REGIONAL_CONFIG))
+    page: int = 1
+
 class AdvancedSearchRequest(BaseModel):
     query: str
     country: str = "US"
@@ -256,249 +246,217 @@ async def create_status_check(input: StatusCheckCreate):
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(response: Response, after: Optional[str] = None, limit: int = STATUS_PAGE_DEFAULT,
+                            format: str = "json"):
+    """Status checks in (timestamp, id) order.
+
+    JSON returns one page of up to ``limit`` records; when more may follow,
+    the X-Next-Cursor header holds the ``after`` value for the next page.
+    ``format=ndjson`` streams every record after ``after``, one per line.
+    """
+    try:
+        query = after_filter(after) if after else {}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = db.status_checks.find(query, {"_id": 0}).sort([("timestamp", 1), ("id", 1)])
+    
+    if format == "ndjson":
+        return StreamingResponse(_stream_status_checks(cursor), media_type="application/x-ndjson")
+    
+    limit = max(1, min(limit, STATUS_PAGE_MAX))
+    status_checks = [StatusCheck(**status_check) for status_check in await cursor.limit(limit).to_list(limit)]
+    if len(status_checks) == limit:
+        last = status_checks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.timestamp, last.id)
+    return status_checks
+
+async def _stream_status_checks(cursor):
+    # Encode each record as the cursor yields it, so memory stays flat
+    async for status_check in cursor.batch_size(STATUS_PAGE_DEFAULT):
+        yield json.dumps({
+            "id": status_check["id"],
+            "client_name": status_check["client_name"],
+            "timestamp": status_check["timestamp"].isoformat()
+        }) + "\n"
 
 @api_router.post("/products/search")
-async def search_products(request: ProductSearchRequest):
+async def search_products(request: ProductSearchRequest, accept_encoding: Optional[str] = Header(None)):
     try:
-        # Check MongoDB cache first (cache for 1 hour)
-        cache_key = f"{request.query}_{request.country}_{request.page}"
-        cached = await db.product_searches.find_one({
-            "cache_key": cache_key,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
+        # L1 hits skip decoding and re-encoding the results: the encoded bytes go out as is
+        key, loader = _search_cache_entry(request.query, request.country, request.page)
+        body, cached, stale = await search_results.get_body(key, loader)
+        # Compressed variants are encoded for fresh hits only
+        encoding, content = choose_variant(body, accept_encoding) if cached and not stale else (None, None)
+        return json_response(content or _search_body(body["json"], cached, stale), encoding)
         
-        if cached:
-            return {"products": cached["results"], "cached": True}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@api_router.get("/products/search/stream")
+async def stream_search_pages(query: str, country: str = "US", pages: int = 3):
+    """Fetch search pages 1..pages concurrently and stream each over SSE as it arrives.
+
+    Emits one "page" event per page in completion order, an "error" event
+    for a page that failed, and a final "done" event with the totals.
+    Cached pages arrive at once; upstream loads are paced by the region's
+    rate limit, so a cold stream takes about pages / PAAPI_TPS seconds.
+    """
+    if not 1 <= pages <= MAX_SEARCH_PAGES:
+        raise HTTPException(status_code=400, detail=f"pages must be between 1 and {MAX_SEARCH_PAGES}")
+    # Reject an unsupported country before the stream starts
+    paapi_clients.get(country)
+    return StreamingResponse(
+        _search_page_events(query, country, pages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _search_page_events(query: str, country: str, pages: int):
+    # Pace the stream's upstream loads to what the region's limiter admits within
+    # its max wait, so a cold stream queues its pages instead of failing some
+    fan_out = paapi_clients.limiters[country].fan_out()
+    upstream_slots = asyncio.Semaphore(min(pages, fan_out or pages))
+    
+    async def fetch_page(page: int):
+        key, loader = _search_cache_entry(query, country, page)
         
-        # PAAPI search request
-        paapi_client = PAAPIClient(request.country)
-        response = paapi_client.search_products(request.query, request.page)
+        async def paced_loader():
+            async with upstream_slots:
+                return await loader()
         
-        if not response or not hasattr(response, 'items') or not response.items:
-            return {"products": [], "cached": False}
+        try:
+            return page, await search_results.get_or_fetch(key, paced_loader), None
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logging.error(f"Search page {page} failed: {detail}")
+            return page, None, detail
+    
+    # Every page goes through the same cache and per-region rate limiter as /products/search
+    tasks = [asyncio.ensure_future(fetch_page(page)) for page in range(1, pages + 1)]
+    total_count = 0
+    failed = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            page, result, error = await next_done
+            if error is not None:
+                failed.append(page)
+                yield _sse("error", {"page": page, "detail": error})
+                continue
+            products, cached, stale = result
+            total_count += len(products)
+            yield _sse("page", {"page": page, "products": products, "cached": cached, "stale": stale})
+        yield _sse("done", {"pages": pages, "total_count": total_count, "failed_pages": sorted(failed)})
+    finally:
+        # Client went away: stop waiting; coalesced upstream loads still finish and get cached
+        for task in tasks:
+            task.cancel()
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@api_router.post("/products/search/regions")
+async def search_products_across_regions(request: MultiRegionSearchRequest):
+    """Search several marketplaces in parallel and merge the results by ASIN"""
+    try:
+        countries = list(dict.fromkeys(request.countries))
+        if not countries:
+            raise HTTPException(status_code=400, detail="At least one country is required")
+        for country in countries:
+            paapi_clients.get(country)
+        
+        # Each region is served from its own search cache; latency is that of the slowest miss
+        results = await asyncio.gather(
+            *[_get_search_results(request.query, country, request.page) for country in countries],
+            return_exceptions=True
+        )
         
-        # Process results
-        processed_products = []
-        if response and hasattr(response, 'items') and response.items:
-            for item in response.items:
-                try:
-                    asin = item.asin if hasattr(item, 'asin') else ''
-                    
-                    # Get title
-                    title = "Unknown"
-                    if hasattr(item, 'item_info') and item.item_info and hasattr(item.item_info, 'title') and item.item_info.title:
-                        title = item.item_info.title.display_value
-                    
-                    # Get image
-                    image_url = None
-                    if hasattr(item, 'images') and item.images and hasattr(item.images, 'primary') and item.images.primary and hasattr(item.images.primary, 'large'):
-                        image_url = item.images.primary.large.url
-                    
-                    # Get price
-                    price_data = None
-                    if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings:
-                        price_info = item.offers.listings[0].price
-                        if price_info and hasattr(price_info, 'amount'):
-                            price_data = {
-                                "amount": float(price_info.amount),
-                                "currency": price_info.currency if hasattr(price_info, 'currency') else 'USD'
-                            }
-                    
-                    # Get reviews
-                    rating = None
-                    review_count = None
-                    if hasattr(item, 'customer_reviews') and item.customer_reviews:
-                        if hasattr(item.customer_reviews, 'star_rating') and item.customer_reviews.star_rating:
-                            rating = float(item.customer_reviews.star_rating.value)
-                        if hasattr(item.customer_reviews, 'count'):
-                            review_count = int(item.customer_reviews.count)
-                    
-                    # Auto-detect category from title
-                    category = "General"
-                    title_lower = title.lower()
-                    if any(word in title_lower for word in ["headphone", "earbuds", "mouse", "cable", "phone"]):
-                        category = "Electronics"
-                    elif any(word in title_lower for word in ["mug", "pillow", "light", "pot", "storage"]):
-                        category = "Home"
-                    elif any(word in title_lower for word in ["moisturizer", "mask", "balm", "polish"]):
-                        category = "Beauty"
-                    elif any(word in title_lower for word in ["yoga", "bottle", "bands", "shoes"]):
-                        category = "Sports"
-                    elif any(word in title_lower for word in ["book", "guide", "novel"]):
-                        category = "Books"
-                    
-                    product_data = {
-                        "asin": asin,
-                        "title": title,
-                        "image_url": image_url,
-                        "price": price_data,
-                        "rating": rating,
-                        "review_count": review_count,
-                        "category": category,
-                        "affiliate_url": f"https://www.amazon.com/dp/{asin}?tag={paapi_client.partner_tag}" if request.country == "US" else f"https://www.amazon.{request.country.lower()}/dp/{asin}?tag={paapi_client.partner_tag}",
-                        "country": request.country,
-                        "last_updated": datetime.utcnow().isoformat()
+        regions = {}
+        merged = {}
+        for country, result in zip(countries, results):
+            if isinstance(result, Exception):
+                detail = result.detail if isinstance(result, HTTPException) else str(result)
+                logging.error(f"Search in {country} failed: {detail}")
+                regions[country] = {"error": detail}
+                continue
+            products, cached, stale = result
+            regions[country] = {"count": len(products), "cached": cached, "stale": stale}
+            for product in products:
+                entry = merged.get(product["asin"])
+                if entry is None:
+                    entry = merged[product["asin"]] = {
+                        key: value for key, value in product.items()
+                        if key not in ("price", "affiliate_url", "country", "last_updated")
                     }
-                    processed_products.append(product_data)
-                except Exception as item_error:
-                    logging.error(f"Error processing item: {str(item_error)}")
-                    continue
-        
-        # Cache results for 1 hour
-        await db.product_searches.insert_one({
-            "cache_key": cache_key,
-            "results": processed_products,
-            "expires_at": datetime.utcnow() + timedelta(hours=1),
-            "created_at": datetime.utcnow()
-        })
-        
-        return {"products": processed_products, "cached": False}
-        
+                    entry["regions"] = {}
+                entry["regions"].setdefault(country, {
+                    "price": product["price"],
+                    "affiliate_url": product["affiliate_url"],
+                    "last_updated": product["last_updated"]
+                })
+        
+        if all("error" in region for region in regions.values()):
+            failure = results[0]
+            raise failure if isinstance(failure, HTTPException) else HTTPException(status_code=500, detail=str(failure))
+        
+        return {"products": list(merged.values()), "regions": regions}
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Search failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+        logging.error(f"Multi-region search failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Multi-region search failed: {str(e)}")
+
+async def _get_search_results(query: str, country: str, page: int):
+    """Unfiltered, normalized results for one search page, plus (cached, stale) flags"""
+    key, loader = _search_cache_entry(query, country, page)
+    return await search_results.get_or_fetch(key, loader)
+
+def _search_cache_entry(query: str, country: str, page: int):
+    # Cache key and upstream loader of one search page; counts the access for warming
+    cache_key = f"{query}_{country}_{page}"
+    loader = lambda: _search_upstream(query, country, page)
+    refresh_scheduler.track(search_results, (cache_key,), country, loader)
+    return (cache_key,), loader
+
+async def _search_upstream(query: str, country: str, page: int) -> List[dict]:
+    # PAAPI search request
+    paapi_client = paapi_clients.get(country)
+    response = await paapi_client.search_products_async(query, page)
+    
+    # Process results
+    with span("normalize"):
+        return paapi_client.normalizer.normalize(response_items(response))
 
 @api_router.post("/products/advanced-search")
 async def advanced_search(request: AdvancedSearchRequest):
     try:
-        # Generate cache key including filters
-        cache_key = f"advanced_{request.query}_{request.country}_{request.page}_{request.min_price}_{request.max_price}_{request.min_rating}_{request.category}_{request.sort_by}"
-        
-        # Check cache first
-        cached = await db.advanced_searches.find_one({
-            "cache_key": cache_key,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        if cached:
-            return {
-                "products": cached["results"], 
-                "cached": True,
-                "total_count": cached.get("total_count", 0),
-                "filters_applied": cached.get("filters_applied", {}),
-                "suggestions": cached.get("suggestions", [])
-            }
-        
-        # Get base search results
-        paapi_client = PAAPIClient(request.country)
-        response = paapi_client.search_products(request.query, request.page, {
-            "min_price": request.min_price,
-            "max_price": request.max_price,
-            "min_rating": request.min_rating,
-            "category": request.category
-        })
-        
-        if not response or not hasattr(response, 'items') or not response.items:
-            return {"products": [], "cached": False, "total_count": 0}
-        
-        # Process and filter results
-        processed_products = []
-        for item in response.items:
-            try:
-                asin = item.asin if hasattr(item, 'asin') else ''
-                
-                # Get title
-                title = "Unknown"
-                if hasattr(item, 'item_info') and item.item_info and hasattr(item.item_info, 'title') and item.item_info.title:
-                    title = item.item_info.title.display_value
-                
-                # Get image
-                image_url = None
-                if hasattr(item, 'images') and item.images and hasattr(item.images, 'primary') and item.images.primary and hasattr(item.images.primary, 'large'):
-                    image_url = item.images.primary.large.url
-                
-                # Get price
-                price_data = None
-                price_amount = 0
-                if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings:
-                    price_info = item.offers.listings[0].price
-                    if price_info and hasattr(price_info, 'amount'):
-                        price_amount = float(price_info.amount)
-                        price_data = {
-                            "amount": price_amount,
-                            "currency": price_info.currency if hasattr(price_info, 'currency') else 'USD'
-                        }
-                
-                # Get reviews
-                rating = 0
-                review_count = 0
-                if hasattr(item, 'customer_reviews') and item.customer_reviews:
-                    if hasattr(item.customer_reviews, 'star_rating') and item.customer_reviews.star_rating:
-                        rating = float(item.customer_reviews.star_rating.value)
-                    if hasattr(item.customer_reviews, 'count'):
-                        review_count = int(item.customer_reviews.count)
-                
-                # Auto-detect category
-                category = "General"
-                title_lower = title.lower()
-                if any(word in title_lower for word in ["headphone", "earbuds", "mouse", "cable", "phone"]):
-                    category = "Electronics"
-                elif any(word in title_lower for word in ["mug", "pillow", "light", "pot", "storage"]):
-                    category = "Home"
-                elif any(word in title_lower for word in ["moisturizer", "mask", "balm", "polish"]):
-                    category = "Beauty"
-                elif any(word in title_lower for word in ["yoga", "bottle", "bands", "shoes"]):
-                    category = "Sports"
-                elif any(word in title_lower for word in ["book", "guide", "novel"]):
-                    category = "Books"
-                
-                # Apply filters
-                if request.min_price and price_amount < request.min_price:
-                    continue
-                if request.max_price and price_amount > request.max_price:
-                    continue
-                if request.min_rating and rating < request.min_rating:
-                    continue
-                if request.category and category != request.category:
-                    continue
-                
-                product_data = {
-                    "asin": asin,
-                    "title": title,
-                    "image_url": image_url,
-                    "price": price_data,
-                    "rating": rating,
-                    "review_count": review_count,
-                    "category": category,
-                    "affiliate_url": f"https://www.amazon.com/dp/{asin}?tag={paapi_client.partner_tag}" if request.country == "US" else f"https://www.amazon.{request.country.lower()}/dp/{asin}?tag={paapi_client.partner_tag}",
-                    "country": request.country,
-                    "last_updated": datetime.utcnow().isoformat()
-                }
-                processed_products.append(product_data)
-            except Exception as item_error:
-                logging.error(f"Error processing item: {str(item_error)}")
-                continue
-        
-        # Apply sorting
-        if request.sort_by == "price_low":
-            processed_products.sort(key=lambda x: x["price"]["amount"] if x["price"] else 0)
-        elif request.sort_by == "price_high":
-            processed_products.sort(key=lambda x: x["price"]["amount"] if x["price"] else 0, reverse=True)
-        elif request.sort_by == "rating":
-            processed_products.sort(key=lambda x: x["rating"] or 0, reverse=True)
-        elif request.sort_by == "review_count":
-            processed_products.sort(key=lambda x: x["review_count"] or 0, reverse=True)
+        # Filters and sorting run in-process over the shared base result set,
+        # so changing them never costs an upstream call or another cache entry
+        base_products, cached, stale = await _get_search_results(request.query, request.country, request.page)
+        with span("filter_sort"):
+            processed_products = _filter_and_sort(base_products, request)
         
         # Generate suggestions if requested
         suggestions = []
         if request.include_suggestions:
-            # Store search query for future suggestions
-            await db.search_queries.update_one(
-                {"query": request.query.lower()},
-                {"$inc": {"count": 1}, "$set": {"last_used": datetime.utcnow()}},
-                upsert=True
-            )
-            
-            # Get popular related searches
-            similar_queries = await db.search_queries.find({
-                "query": {"$regex": f".*{request.query.lower()}.*"},
-                "query": {"$ne": request.query.lower()}
-            }).sort("count", -1).limit(5).to_list(5)
-            
-            suggestions = [{"query": q["query"], "count": q["count"]} for q in similar_queries]
+            with span("suggestions"):
+                query = request.query.lower()
+                
+                # Store search query for future suggestions (written behind);
+                # overlong queries are not worth indexing and cost too much to insert
+                if len(query) <= MAX_QUERY_LENGTH:
+                    query_counter.increment(query)
+                    suggestion_index.increment(query)
+                    related_query_index.increment(query)
+                
+                # Get popular related searches containing the query at a word start
+                suggestions = [
+                    {"query": related, "count": count}
+                    for related, count in related_query_index.complete(query, 6)
+                    if related != query
+                ][:5]
         
         # Prepare response
         filters_applied = {
@@ -509,43 +467,58 @@ async def advanced_search(request: AdvancedSearchRequest):
             "sort_by": request.sort_by
         }
         
-        # Cache results
-        await db.advanced_searches.insert_one({
-            "cache_key": cache_key,
-            "results": processed_products,
-            "total_count": len(processed_products),
-            "filters_applied": filters_applied,
-            "suggestions": suggestions,
-            "expires_at": datetime.utcnow() + timedelta(hours=1),
-            "created_at": datetime.utcnow()
-        })
-        
         return {
             "products": processed_products,
-            "cached": False,
+            "cached": cached,
+            "stale": stale,
             "total_count": len(processed_products),
             "filters_applied": filters_applied,
             "suggestions": suggestions
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Advanced search failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Advanced search failed: {str(e)}")
 
+def _filter_and_sort(products: List[dict], request: AdvancedSearchRequest) -> List[dict]:
+    # Build a new list; the base products are shared with the caches
+    filtered = []
+    for product_data in products:
+        price_amount = product_data["price"]["amount"] if product_data["price"] else 0
+        rating = product_data["rating"] or 0
+        
+        # Apply filters
+        if request.min_price and price_amount < request.min_price:
+            continue
+        if request.max_price and price_amount > request.max_price:
+            continue
+        if request.min_rating and rating < request.min_rating:
+            continue
+        if request.category and product_data.get("category") != request.category:
+            continue
+        
+        filtered.append(product_data)
+    
+    # Apply sorting
+    if request.sort_by == "price_low":
+        filtered.sort(key=lambda x: x["price"]["amount"] if x["price"] else 0)
+    elif request.sort_by == "price_high":
+        filtered.sort(key=lambda x: x["price"]["amount"] if x["price"] else 0, reverse=True)
+    elif request.sort_by == "rating":
+        filtered.sort(key=lambda x: x["rating"] or 0, reverse=True)
+    elif request.sort_by == "review_count":
+        filtered.sort(key=lambda x: x["review_count"] or 0, reverse=True)
+    
+    return filtered
+
 @api_router.get("/categories")
-async def get_categories():
-    """Get available product categories with counts"""
+async def get_categories(country: Optional[str] = None):
+    """Get available product categories with counts of cached products, optionally for one country"""
     try:
-        # For demo purposes, return static categories
-        # In real implementation, this would query the database
-        categories = [
-            {"name": "Electronics", "value": "Electronics", "count": 150},
-            {"name": "Home & Kitchen", "value": "Home", "count": 120},
-            {"name": "Beauty & Personal Care", "value": "Beauty", "count": 95},
-            {"name": "Sports & Outdoors", "value": "Sports", "count": 80},
-            {"name": "Books", "value": "Books", "count": 65},
-            {"name": "All Categories", "value": "", "count": 510}
-        ]
+        # One read of the materialized counts, kept current as products are cached
+        categories = await category_counts.get(country)
         return {"categories": categories}
     except Exception as e:
         logging.error(f"Failed to get categories: {str(e)}")
@@ -557,96 +530,49 @@ async def get_search_suggestions(q: str = ""):
     try:
         if not q:
             # Return popular searches
-            popular = await db.search_queries.find().sort("count", -1).limit(10).to_list(10)
-            return {"suggestions": [p["query"] for p in popular]}
-        
-        # Return queries that match the input
-        similar = await db.search_queries.find({
-            "query": {"$regex": f"^{q.lower()}.*"}
-        }).sort("count", -1).limit(8).to_list(8)
+            return {"suggestions": [query for query, _ in suggestion_index.popular(10)]}
         
-        return {"suggestions": [s["query"] for s in similar]}
+        # Return queries that start with the input
+        return {"suggestions": [query for query, _ in suggestion_index.complete(q, 8)]}
     except Exception as e:
         logging.error(f"Failed to get suggestions: {str(e)}")
         return {"suggestions": []}
 
+@api_router.get("/stats")
+async def get_stats():
+    """Get in-process cache and upstream call statistics"""
+    return {
+        "caches": {tier.name: tier.stats() for tier in CACHE_TIERS},
+        "coalescing": {tier.name: tier.flight.stats() for tier in CACHE_TIERS},
+        "l1_cache": {tier.name: tier.l1.stats() for tier in CACHE_TIERS},
+        "asin_batching": {
+            country: batcher.stats()
+            for country, batcher in paapi_clients.batchers.items()
+        },
+        "circuit_breakers": {
+            country: breaker.stats()
+            for country, breaker in paapi_clients.breakers.items()
+        },
+        "rate_limits": {
+            country: limiter.stats()
+            for country, limiter in paapi_clients.limiters.items()
+        },
+        "query_counter": query_counter.stats(),
+        "suggestion_index": {"autocomplete": suggestion_index.stats(), "related": related_query_index.stats()},
+        "category_counts": category_counts.stats(),
+        "refresh_scheduler": refresh_scheduler.stats(),
+        "mock_paapi": mock_paapi.stats() if mock_paapi else None
+    }
+
 @api_router.get("/products/{asin}")
 async def get_product_details(asin: str, country: str = "US"):
     try:
-        # Check cache first (cache for 30 minutes)
-        cached = await db.products.find_one({
-            "asin": asin,
-            "country": country,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        if cached:
-            return {"product": cached["data"], "cached": True}
-        
-        # Fetch from PAAPI
-        paapi_client = PAAPIClient(country)
-        response = paapi_client.get_product_details(asin)
-        
-        if not response or not response.items:
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        item = response.items[0]
-        
-        price_data = None
-        availability = "Unknown"
-        if hasattr(item, 'offers') and item.offers and hasattr(item.offers, 'listings') and item.offers.listings:
-            price_info = item.offers.listings[0].price
-            if price_info and hasattr(price_info, 'amount'):
-                price_data = {
-                    "amount": float(price_info.amount),
-                    "currency": price_info.currency if hasattr(price_info, 'currency') else 'USD'
-                }
-            if hasattr(item.offers.listings[0], 'availability') and item.offers.listings[0].availability:
-                availability = item.offers.listings[0].availability.message
-        
-        rating = None
-        review_count = None
-        if hasattr(item, 'customer_reviews') and item.customer_reviews:
-            if hasattr(item.customer_reviews, 'star_rating') and item.customer_reviews.star_rating:
-                rating = float(item.customer_reviews.star_rating.value)
-            if hasattr(item.customer_reviews, 'count'):
-                review_count = int(item.customer_reviews.count)
-        
-        title = "Unknown"
-        if hasattr(item, 'item_info') and item.item_info and hasattr(item.item_info, 'title') and item.item_info.title:
-            title = item.item_info.title.display_value
-        
-        image_url = None
-        if hasattr(item, 'images') and item.images and hasattr(item.images, 'primary') and item.images.primary and hasattr(item.images.primary, 'large'):
-            image_url = item.images.primary.large.url
-        
-        product_data = {
-            "asin": item.asin,
-            "title": title,
-            "image_url": image_url,
-            "price": price_data,
-            "availability": availability,
-            "rating": rating,
-            "review_count": review_count,
-            "affiliate_url": f"https://www.amazon.com/dp/{item.asin}?tag={paapi_client.partner_tag}" if country == "US" else f"https://www.amazon.{country.lower()}/dp/{item.asin}?tag={paapi_client.partner_tag}",
-            "country": country,
-            "last_updated": datetime.utcnow().isoformat()
-        }
-        
-        # Cache for 30 minutes
-        await db.products.update_one(
-            {"asin": asin, "country": country},
-            {
-                "$set": {
-                    "data": product_data,
-                    "expires_at": datetime.utcnow() + timedelta(minutes=30),
-                    "updated_at": datetime.utcnow()
-                }
-            },
-            upsert=True
-        )
-        
-        return {"product": product_data, "cached": False}
+        asin = normalize_asin(asin)
+        # Served from cache for 30 minutes, then stale while refreshed
+        loader = lambda: _fetch_product(asin, country)
+        refresh_scheduler.track(product_details, (asin, country), country, loader)
+        product_data, cached, stale = await product_details.get_or_fetch((asin, country), loader)
+        return {"product": product_data, "cached": cached, "stale": stale}
         
     except HTTPException:
         raise
@@ -654,51 +580,26 @@ async def get_product_details(asin: str, country: str = "US"):
         logging.error(f"Failed to get product details: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get product details: {str(e)}")
 
+async def _fetch_product(asin: str, country: str) -> dict:
+    # Fetch from PAAPI, batched with other lookups for the same region
+    paapi_client = paapi_clients.get(country)
+    item = await paapi_clients.batcher(country).get_item(asin)
+    
+    with span("normalize"):
+        product_data = paapi_client.normalizer.normalize_product(item) if item else None
+    if not product_data:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product_data
+
 @api_router.get("/products/{asin}/price")
 async def get_real_time_price(asin: str, country: str = "US"):
     try:
-        # Check for recent price data (5 minutes)
-        recent_price = await db.prices.find_one({
-            "asin": asin,
-            "country": country,
-            "expires_at": {"$gt": datetime.utcnow()}
-        })
-        
-        if recent_price:
-            return {"price": recent_price["price_data"], "cached": True}
-        
-        # Fetch fresh price data
-        paapi_client = PAAPIClient(country)
-        response = paapi_client.get_product_details(asin)
-        
-        if not response or not response.items or not response.items[0].offers:
-            raise HTTPException(status_code=404, detail="Price not available")
-        
-        item = response.items[0]
-        price_info = item.offers.listings[0].price
-        
-        price_data = {
-            "amount": float(price_info.amount) if price_info.amount else None,
-            "currency": price_info.currency if price_info.currency else None,
-            "availability": item.offers.listings[0].availability.message if item.offers.listings[0].availability else "Unknown",
-            "last_updated": datetime.utcnow().isoformat(),
-            "affiliate_url": f"https://www.amazon.com/dp/{asin}?tag={paapi_client.partner_tag}" if country == "US" else f"https://www.amazon.{country.lower()}/dp/{asin}?tag={paapi_client.partner_tag}"
-        }
-        
-        # Cache price for 5 minutes
-        await db.prices.update_one(
-            {"asin": asin, "country": country},
-            {
-                "$set": {
-                    "price_data": price_data,
-                    "expires_at": datetime.utcnow() + timedelta(minutes=5),
-                    "updated_at": datetime.utcnow()
-                }
-            },
-            upsert=True
-        )
-        
-        return {"price": price_data, "cached": False}
+        asin = normalize_asin(asin)
+        # Served from cache for 5 minutes, then stale while refreshed
+        loader = lambda: _fetch_price(asin, country)
+        refresh_scheduler.track(product_prices, (asin, country), country, loader)
+        price_data, cached, stale = await product_prices.get_or_fetch((asin, country), loader)
+        return {"price": price_data, "cached": cached, "stale": stale}
         
     except HTTPException:
         raise
@@ -706,15 +607,193 @@ async def get_real_time_price(asin: str, country: str = "US"):
         logging.error(f"Failed to get price: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get price: {str(e)}")
 
+async def _fetch_price(asin: str, country: str) -> dict:
+    # Fetch fresh price data, batched with other lookups for the same region
+    paapi_client = paapi_clients.get(country)
+    item = await paapi_clients.batcher(country).get_item(asin)
+    
+    with span("normalize"):
+        price_data = paapi_client.normalizer.normalize_price(item, asin) if item else None
+    if not price_data:
+        raise HTTPException(status_code=404, detail="Price not available")
+    return price_data
+
+@api_router.post("/products/batch")
+async def get_products_batch(request: ProductBatchRequest):
+    """Get product details for many ASINs in one call, keyed by ASIN"""
+    try:
+        products, unavailable = await _resolve_batch(
+            request, product_details, _fetch_product,
+            lambda normalizer, item: normalizer.normalize_product(item)
+        )
+        return {
+            "products": products,
+            "not_found": [asin for asin, data in products.items() if data is None],
+            "unavailable": unavailable
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Failed to get product batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get product batch: {str(e)}")
+
+@api_router.post("/products/batch/prices")
+async def get_prices_batch(request: ProductBatchRequest):
+    """Get current prices for many ASINs in one call, keyed by ASIN"""
+    try:
+        prices, unavailable = await _resolve_batch(
+            request, product_prices, _fetch_price,
+            lambda normalizer, item: normalizer.normalize_price(item)
+        )
+        return {
+            "prices": prices,
+            "not_found": [asin for asin, data in prices.items() if data is None],
+            "unavailable": unavailable
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Failed to get price batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get price batch: {str(e)}")
+
+async def _resolve_batch(request: ProductBatchRequest, tier: CacheTier, fetch_one, build_data):
+    """Data per resolved ASIN (None when not found), plus the ASINs PAAPI could not serve"""
+    # Resolve ASINs from L1 and one $in query, then upstream for the rest
+    requested = list(dict.fromkeys(request.asins))
+    if len(requested) > MAX_BATCH_ASINS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ASINS} ASINs per batch")
+    country = request.country
+    paapi_client = paapi_clients.get(country)
+    
+    # Results are keyed by the normalized ASIN; anything that is not an ASIN is not found
+    keys = []
+    results = {}
+    for asin in requested:
+        try:
+            keys.append(normalize_asin(asin))
+        except HTTPException:
+            keys.append(asin)
+            results[asin] = None
+    keys = list(dict.fromkeys(keys))
+    asins = [asin for asin in keys if asin not in results]
+    
+    loaders = {asin: (lambda asin=asin: fetch_one(asin, country)) for asin in asins}
+    for asin in asins:
+        refresh_scheduler.track(tier, (asin, country), country, loaders[asin])
+    
+    for (asin, _), (data, stale) in (await tier.get_many([(asin, country) for asin in asins])).items():
+        results[asin] = data
+        if stale:
+            tier.refresh_in_background((asin, country), loaders[asin])
+    
+    unavailable = []
+    misses = []
+    for asin in asins:
+        if asin in results:
+            continue
+        if tier.is_missing((asin, country)):
+            # Recently not found: answer as the upstream lookup did
+            results[asin] = None
+        else:
+            misses.append(asin)
+    if misses:
+        # The batcher sends these upstream in GetItems chunks of up to 10 ASINs
+        batcher = paapi_clients.batcher(country)
+        items = await asyncio.gather(*[batcher.get_item(asin) for asin in misses], return_exceptions=True)
+        
+        fresh = {}
+        failed = []
+        for asin, item in zip(misses, items):
+            if isinstance(item, UpstreamUnavailable):
+                failed.append(asin)
+                continue
+            if isinstance(item, HTTPException) and item.status_code == 400:
+                # PAAPI rejected the ASIN: nothing to look up
+                item = None
+            elif isinstance(item, BaseException):
+                raise item
+            with span("normalize"):
+                data = build_data(paapi_client.normalizer, item) if item else None
+            results[asin] = data
+            if data is not None:
+                fresh[(asin, country)] = data
+            else:
+                tier.remember_missing((asin, country))
+        await tier.put_many(fresh)
+        
+        if failed:
+            # Fall back to the last known data; ASINs without any are reported, not failed
+            last = await tier.last_known([(asin, country) for asin in failed])
+            for asin in failed:
+                if (asin, country) in last:
+                    results[asin] = last[(asin, country)]
+                else:
+                    unavailable.append(asin)
+            if len(unavailable) == len(keys):
+                raise UpstreamUnavailable(country)
+    
+    return {asin: results[asin] for asin in keys if asin in results}, unavailable
+
+def _collect_metrics():
+    # Read at scrape time from the same counters /api/stats reports
+    tiers = [(tier.name, tier.stats()) for tier in CACHE_TIERS]
+    yield ("cache_requests_total", "counter", "Cache lookups by cache collection and result", [
+        ({"cache": name, "result": result}, stats[key])
+        for name, stats in tiers
+        for result, key in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))
+    ])
+    yield ("cache_fallbacks_total", "counter", "Reads served from last known data while PAAPI was unavailable", [
+        ({"cache": name}, stats["fallbacks"]) for name, stats in tiers
+    ])
+    yield ("cache_background_refreshes_total", "counter", "Stale entries refreshed in the background", [
+        ({"cache": name}, stats["refreshes"]) for name, stats in tiers
+    ])
+    yield ("paapi_rate_limit_queue_depth", "gauge", "Upstream calls waiting for a rate limit token", [
+        ({"region": country}, limiter.queue_depth()) for country, limiter in paapi_clients.limiters.items()
+    ])
+    yield ("paapi_circuit_open", "gauge", "1 while the region's circuit breaker is not closed", [
+        ({"region": country}, int(breaker.state != "closed")) for country, breaker in paapi_clients.breakers.items()
+    ])
+
+metrics_registry.register_collector(_collect_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request, cache, PAAPI and MongoDB metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+# Per-request phase timings: Server-Timing header plus a ring buffer of slow requests
+slow_requests = SlowRequestLog(
+    threshold_ms=float(os.environ.get('SLOW_REQUEST_MS', '1000')),
+    size=int(os.environ.get('SLOW_REQUEST_BUFFER', '100'))
+)
+
+@api_router.get("/debug/slow-requests")
+async def get_slow_requests(limit: int = 50):
+    """Most recent requests slower than SLOW_REQUEST_MS, newest first, with their phase timings"""
+    return {
+        "threshold_ms": slow_requests.threshold_ms,
+        "recorded": slow_requests.recorded,
+        "requests": slow_requests.recent(limit)
+    }
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    TracingMiddleware,
+    slow_log=slow_requests,
+    enabled=os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
 
 # Configure logging
@@ -724,6 +803,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_paapi_clients():
+    paapi_clients.start()
+
+@app.on_event("startup")
+async def startup_db_indexes():
+    await ensure_indexes(db, CACHE_RETENTION_SECONDS)
+
+@app.on_event("startup")
+async def startup_suggestion_index():
+    await suggestion_index.load_from_collection(db.search_queries, SUGGESTION_INDEX_MAX_QUERIES)
+    related_query_index.load(suggestion_index.counts.items())
+    logging.info(f"Loaded {len(suggestion_index.counts)} search queries into the suggestion index")
+    query_counter.start()
+
+@app.on_event("startup")
+async def startup_refresh_scheduler():
+    refresh_scheduler.start()
+    category_counts.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    # Flush buffered popularity counters before the connection goes away
+    await query_counter.stop()
+    await refresh_scheduler.stop()
+    # Let category counts of the last writes land before the counter stops
+    for tier in (search_results, product_details, product_prices):
+        await tier.wait_for_listeners()
+    await category_counts.stop()
+    paapi_clients.shutdown()
     client.close()
@@ -0,0 +1,164 @@
+from bisect import insort
+from typing import Dict, Iterable, List, Tuple
+import heapq
+import itertools
+
+# Longer queries are not indexed: inserting one costs its length times its word starts
+MAX_QUERY_LENGTH = 100
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # (-count, query) pairs kept sorted, so the highest count comes first
+        self.top: List[Tuple[int, str]] = []
+
+
+class SuggestionIndex:
+    """In-memory prefix trie over search queries for autocomplete.
+
+    Every node keeps the top-K queries below it by count, so a lookup costs
+    one walk down the prefix. With ``index_words`` each query is also
+    indexed under the start of every later word, which lets a lookup find
+    queries that contain the prefix at a word boundary.
+
+    Counts are expected to only grow between full loads, which keeps every
+    node's top-K exact under incremental updates.
+
+    Queries longer than ``max_query_length`` are ignored, and at most
+    ``max_word_starts`` later words of a query are indexed. Once the index
+    holds more than ``max_queries`` queries or ``max_nodes`` trie nodes,
+    the lowest counts are evicted, least recently updated first. A node's
+    top-K may then miss a query that lost its place to an evicted one until
+    that query is counted again.
+    """
+
+    def __init__(self, top_k: int = 10, index_words: bool = False, max_queries: int = 100000,
+                 max_nodes: int = 1000000, max_query_length: int = MAX_QUERY_LENGTH, max_word_starts: int = 8):
+        self.top_k = top_k
+        self.index_words = index_words
+        self.max_queries = max_queries
+        self.max_nodes = max_nodes
+        self.max_query_length = max_query_length
+        self.max_word_starts = max_word_starts
+        self.counts: Dict[str, int] = {}
+        self._root = _Node()
+        self.nodes = 1
+        # (count, seq, query) per update; entries whose count is outdated are skipped on eviction
+        self._by_count: List[Tuple[int, int, str]] = []
+        self._updated: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self.evictions = 0
+
+    def load(self, entries: Iterable[Tuple[str, int]]):
+        self.counts = {}
+        self._root = _Node()
+        self.nodes = 1
+        self._by_count = []
+        self._updated = {}
+        # Inserting highest counts first lets full nodes reject the rest early
+        for query, count in sorted(entries, key=lambda entry: -entry[1]):
+            self.set_count(query, count)
+
+    async def load_from_collection(self, collection, limit: int = 100000):
+        entries = []
+        cursor = collection.find({}, {"query": 1, "count": 1, "_id": 0}).sort("count", -1).limit(limit)
+        async for doc in cursor:
+            if doc.get("query"):
+                entries.append((doc["query"], int(doc.get("count", 0))))
+        self.load(entries)
+
+    def increment(self, query: str, by: int = 1):
+        query = query.lower()
+        self.set_count(query, self.counts.get(query, 0) + by)
+
+    def set_count(self, query: str, count: int):
+        query = query.lower()
+        if not query or len(query) > self.max_query_length:
+            return
+        self.counts[query] = count
+        seq = next(self._seq)
+        self._updated[query] = seq
+        heapq.heappush(self._by_count, (count, seq, query))
+        for key in self._keys(query):
+            node = self._root
+            self._offer(node, query, count)
+            for ch in key:
+                child = node.children.get(ch)
+                if child is None:
+                    child = node.children[ch] = _Node()
+                    self.nodes += 1
+                node = child
+                self._offer(node, query, count)
+        self._evict()
+
+    def _evict(self):
+        while len(self.counts) > self.max_queries or (self.nodes > self.max_nodes and self.counts):
+            count, seq, query = heapq.heappop(self._by_count)
+            if self._updated.get(query) != seq:
+                continue
+            del self.counts[query]
+            del self._updated[query]
+            self._remove(query)
+            self.evictions += 1
+        if len(self._by_count) > 2 * len(self.counts) + 1024:
+            # Drop the outdated entries left behind by count updates
+            self._by_count = [(self.counts[query], seq, query) for query, seq in self._updated.items()]
+            heapq.heapify(self._by_count)
+
+    def _remove(self, query: str):
+        for key in self._keys(query):
+            path = [self._root]
+            for ch in key:
+                node = path[-1].children.get(ch)
+                if node is None:
+                    break
+                path.append(node)
+            for node in path:
+                node.top = [entry for entry in node.top if entry[1] != query]
+            # Prune the branch back up to the first node still in use
+            for depth in range(len(path) - 1, 0, -1):
+                node = path[depth]
+                if node.children or node.top:
+                    break
+                del path[depth - 1].children[key[depth - 1]]
+                self.nodes -= 1
+
+    def _keys(self, query: str) -> List[str]:
+        if not self.index_words:
+            return [query]
+        keys = [query]
+        for i, ch in enumerate(query):
+            if ch == " " and i + 1 < len(query) and query[i + 1] != " ":
+                keys.append(query[i + 1:])
+                if len(keys) > self.max_word_starts:
+                    break
+        return keys
+
+    def _offer(self, node: _Node, query: str, count: int):
+        top = node.top
+        entry = (-count, query)
+        if len(top) >= self.top_k and entry >= top[-1]:
+            return
+        for i, (_, existing) in enumerate(top):
+            if existing == query:
+                del top[i]
+                break
+        insort(top, entry)
+        del top[self.top_k:]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        node = self._root
+        for ch in prefix.lower():
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        return [(query, -count) for count, query in node.top[:limit]]
+
+    def popular(self, limit: int = 10) -> List[Tuple[str, int]]:
+        return self.complete("", limit)
+
+    def stats(self) -> dict:
+        return {"queries": len(self.counts), "nodes": self.nodes, "evictions": self.evictions}
@@ -0,0 +1,141 @@
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import time
+
+
+class Trace:
+    """Phase timings of one request"""
+
+    __slots__ = ("started", "spans", "finished")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        self.finished = False
+
+    def summary(self) -> Dict[str, Tuple[int, float]]:
+        # name -> (count, total seconds), in order of first appearance
+        totals: Dict[str, Tuple[int, float]] = {}
+        for name, duration in self.spans:
+            count, total = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, total + duration)
+        return totals
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        # Background tasks spawned by the request may outlive it
+        if not self.trace.finished:
+            self.trace.spans.append((self.name, time.perf_counter() - self.start))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """Time a phase of the current request; a shared no-op outside a traced request"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+class SlowRequestLog:
+    """Ring buffer of the last ``size`` requests that took at least ``threshold_ms``"""
+
+    def __init__(self, threshold_ms: float = 1000.0, size: int = 100):
+        self.threshold_ms = threshold_ms
+        self._entries: deque = deque(maxlen=size)
+        self.recorded = 0
+
+    def record(self, entry: dict):
+        self._entries.append(entry)
+        self.recorded += 1
+
+    def recent(self, limit: int = 100) -> List[dict]:
+        """Newest first"""
+        return list(self._entries)[::-1][:limit]
+
+
+class TracingMiddleware:
+    """ASGI middleware that reports request phases in a Server-Timing header.
+
+    Spans recorded with span() before the response starts go into the
+    header, plus a "total" entry. Requests slower than the log's threshold
+    are kept, with all their spans, in ``slow_log``. With ``enabled`` false
+    no trace is created and span() is a no-op.
+    """
+
+    def __init__(self, app, slow_log: SlowRequestLog, enabled: bool = True):
+        self.app = app
+        self.slow_log = slow_log
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current_trace.set(trace)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", self._server_timing(trace).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            trace.finished = True
+            duration_ms = (time.perf_counter() - trace.started) * 1000
+            if duration_ms >= self.slow_log.threshold_ms:
+                self.slow_log.record({
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "status": status["code"],
+                    "duration_ms": round(duration_ms, 2),
+                    "spans": [
+                        {"name": name, "count": count, "duration_ms": round(total * 1000, 2)}
+                        for name, (count, total) in trace.summary().items()
+                    ],
+                })
+
+    @staticmethod
+    def _server_timing(trace: Trace) -> str:
+        entries = [f"{name};dur={total * 1000:.1f}" for name, (_, total) in trace.summary().items()]
+        entries.append(f"total;dur={(time.perf_counter() - trace.started) * 1000:.1f}")
+        return ", ".join(entries)
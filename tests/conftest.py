@@ -0,0 +1,5 @@
+from pathlib import Path
+import sys
+
+# Backend modules import each other by bare name, as when server.py runs from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+import asyncio
+
+from fastapi import HTTPException
+import pytest
+
+from asin_batcher import AsinBatcher, normalize_asin
+from circuit_breaker import UpstreamUnavailable
+from rate_limiter import BACKGROUND, INTERACTIVE, upstream_priority
+
+
+class FakeClient:
+    """GetItems stand-in that returns the requested ASINs it knows"""
+
+    def __init__(self, known=(), error=None):
+        self.known = set(known)
+        self.error = error
+        self.calls = []
+
+    async def get_items_async(self, asins):
+        self.calls.append((list(asins), upstream_priority.get()))
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(items=[SimpleNamespace(asin=asin) for asin in asins if asin in self.known])
+
+
+def test_concurrent_lookups_share_one_call():
+    async def scenario():
+        client = FakeClient(known={"B000000001", "B000000002"})
+        batcher = AsinBatcher(client, window=0.01)
+        items = await asyncio.gather(*[batcher.get_item(asin)
+                                       for asin in ["B000000001", "b000000001", "B000000002", "B000000009"]])
+        return [item.asin if item else None for item in items], client.calls
+
+    asins, calls = asyncio.run(scenario())
+    assert asins == ["B000000001", "B000000001", "B000000002", None]
+    assert calls == [(["B000000001", "B000000002", "B000000009"], INTERACTIVE)]
+
+
+def test_full_batches_are_sent_without_waiting():
+    async def scenario():
+        client = FakeClient(known={f"B{i:09d}" for i in range(25)})
+        batcher = AsinBatcher(client, window=60, max_batch=10)
+        items = await asyncio.wait_for(
+            asyncio.gather(*[batcher.get_item(f"B{i:09d}") for i in range(20)]), timeout=1)
+        return len(items), [len(asins) for asins, _ in client.calls]
+
+    assert asyncio.run(scenario()) == (20, [10, 10])
+
+
+def test_failure_reaches_every_lookup_in_the_batch():
+    async def scenario():
+        batcher = AsinBatcher(FakeClient(error=UpstreamUnavailable("US", "circuit open")), window=0.01)
+        return await asyncio.gather(*[batcher.get_item(f"B00000000{i}") for i in range(3)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, UpstreamUnavailable) for result in results)
+
+
+def test_batch_goes_out_at_its_most_urgent_priority():
+    async def scenario():
+        client = FakeClient()
+
+        async def lookup(asin, priority):
+            upstream_priority.set(priority)
+            return await batcher.get_item(asin)
+
+        batcher = AsinBatcher(client, window=0.01)
+        await asyncio.gather(lookup("B000000001", BACKGROUND), lookup("B000000002", INTERACTIVE))
+        await asyncio.gather(lookup("B000000003", BACKGROUND))
+        return [priority for _, priority in client.calls]
+
+    assert asyncio.run(scenario()) == [INTERACTIVE, BACKGROUND]
+
+
+@pytest.mark.parametrize("asin", ["", "B00000000", "B0000000001", "B00000000!", "../etc"])
+def test_malformed_asins_are_rejected_before_queuing(asin):
+    with pytest.raises(HTTPException) as raised:
+        normalize_asin(asin)
+    assert raised.value.status_code == 400
+
+
+def test_normalize_asin():
+    assert normalize_asin(" b00000000x ") == "B00000000X"
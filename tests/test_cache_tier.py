@@ -0,0 +1,187 @@
+from datetime import timedelta
+import asyncio
+
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+import pytest
+
+from cache_tier import CacheTier
+from circuit_breaker import UpstreamUnavailable
+from coalesce import SingleFlight
+from l1_cache import L1Cache
+
+
+def make_tier(soft_ttl=timedelta(minutes=5), hard_ttl=timedelta(hours=1), **kwargs):
+    collection = AsyncMongoMockClient()["test"]["cache"]
+    return CacheTier("test", collection, ["key", "country"], "data", soft_ttl, hard_ttl,
+                     L1Cache("test"), SingleFlight("test"), **kwargs)
+
+
+class Loader:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_miss_loads_then_hits():
+    async def scenario():
+        tier = make_tier()
+        loader = Loader(["a"])
+        first = await tier.get_or_fetch(("q", "US"), loader)
+        second = await tier.get_or_fetch(("q", "US"), loader)
+        # Another worker with an empty L1 reads the MongoDB document
+        tier.l1.clear()
+        third = await tier.get_or_fetch(("q", "US"), loader)
+        return first, second, third, loader.calls
+
+    first, second, third, calls = asyncio.run(scenario())
+    assert first == (["a"], False, False)
+    assert second == (["a"], True, False)
+    assert third == (["a"], True, False)
+    assert calls == 1
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        tier = make_tier()
+        loader = Loader(["a"])
+        results = await asyncio.gather(*[tier.get_or_fetch(("q", "US"), loader) for _ in range(5)])
+        return results, loader.calls
+
+    results, calls = asyncio.run(scenario())
+    assert results == [(["a"], False, False)] * 5
+    assert calls == 1
+
+
+def test_stale_entry_is_served_while_refreshed_once():
+    async def scenario():
+        tier = make_tier(soft_ttl=timedelta(0))
+        await tier.put(("q", "US"), ["old"])
+        loader = Loader(["new"])
+        served = await asyncio.gather(*[tier.get_or_fetch(("q", "US"), loader) for _ in range(3)])
+        await asyncio.gather(*tier._refresh_tasks)
+        return served, loader.calls, tier.l1.get(("q", "US")), tier.stats()
+
+    served, calls, refreshed, stats = asyncio.run(scenario())
+    assert served == [(["old"], True, True)] * 3
+    assert calls == 1
+    assert refreshed == ["new"]
+    assert stats["stale_hits"] == 3
+    assert stats["refreshes"] == 1
+
+
+def test_failed_refresh_keeps_the_stale_entry():
+    async def scenario():
+        tier = make_tier(soft_ttl=timedelta(0))
+        await tier.put(("q", "US"), ["old"])
+        loader = Loader(RuntimeError("upstream down"))
+        served = await tier.get_or_fetch(("q", "US"), loader)
+        await asyncio.gather(*tier._refresh_tasks)
+        return served, tier.l1.get(("q", "US")), tier.stats()["refresh_errors"]
+
+    served, kept, errors = asyncio.run(scenario())
+    assert served == (["old"], True, True)
+    assert kept == ["old"]
+    assert errors == 1
+
+
+def test_entry_past_hard_ttl_waits_for_the_loader():
+    async def scenario():
+        tier = make_tier(soft_ttl=timedelta(0), hard_ttl=timedelta(0))
+        await tier.put(("q", "US"), ["old"])
+        loader = Loader(["new"])
+        return await tier.get_or_fetch(("q", "US"), loader), loader.calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == (["new"], False, False)
+    assert calls == 1
+
+
+def test_not_found_is_remembered():
+    async def scenario():
+        tier = make_tier(negative_ttl=timedelta(minutes=1))
+        loader = Loader(HTTPException(status_code=404, detail="Product not found"))
+        for _ in range(2):
+            with pytest.raises(HTTPException) as raised:
+                await tier.get_or_fetch(("q", "US"), loader)
+            assert raised.value.status_code == 404
+        return loader.calls, tier.is_missing(("q", "US"))
+
+    assert asyncio.run(scenario()) == (1, True)
+
+
+def test_empty_result_is_remembered_but_not_stored():
+    async def scenario():
+        tier = make_tier(negative_ttl=timedelta(minutes=1))
+        loader = Loader([])
+        results = [await tier.get_or_fetch(("q", "US"), loader) for _ in range(2)]
+        return results, loader.calls, await tier.collection.count_documents({})
+
+    results, calls, documents = asyncio.run(scenario())
+    assert results == [([], False, False)] * 2
+    assert calls == 1
+    assert documents == 0
+
+
+def test_upstream_failure_falls_back_to_last_known_data():
+    async def scenario():
+        tier = make_tier(soft_ttl=timedelta(0), hard_ttl=timedelta(0))
+        await tier.put(("q", "US"), ["old"])
+        loader = Loader(UpstreamUnavailable("US", "circuit open"))
+        served = await tier.get_or_fetch(("q", "US"), loader)
+        with pytest.raises(UpstreamUnavailable):
+            await tier.get_or_fetch(("other", "US"), loader)
+        return served, tier.stats()["fallbacks"]
+
+    served, fallbacks = asyncio.run(scenario())
+    assert served == (["old"], True, True)
+    assert fallbacks == 1
+
+
+def test_last_known_groups_keys_by_their_tail():
+    async def scenario():
+        tier = make_tier()
+        await tier.put_many({("a", "US"): [1], ("b", "US"): [2], ("a", "UK"): [3]})
+        return await tier.last_known([("a", "US"), ("a", "UK"), ("c", "US")])
+
+    assert asyncio.run(scenario()) == {("a", "US"): [1], ("a", "UK"): [3]}
+
+
+def test_store_listener_runs_in_the_background():
+    async def scenario():
+        recorded = []
+        release = asyncio.Event()
+
+        async def on_store(values):
+            await release.wait()
+            recorded.extend(values)
+
+        tier = make_tier(on_store=on_store)
+        await asyncio.wait_for(tier.put(("q", "US"), ["a"]), timeout=1)
+        before = list(recorded)
+        release.set()
+        await tier.wait_for_listeners()
+        return before, recorded
+
+    assert asyncio.run(scenario()) == ([], [["a"]])
+
+
+def test_failing_store_listener_does_not_fail_the_write():
+    async def scenario():
+        async def on_store(values):
+            raise RuntimeError("listener failed")
+
+        tier = make_tier(on_store=on_store)
+        await tier.put(("q", "US"), ["a"])
+        await tier.wait_for_listeners()
+        return await tier.get(("q", "US"))
+
+    assert asyncio.run(scenario()) == (["a"], False)
@@ -0,0 +1,55 @@
+import random
+
+from categories import CategoryClassifier, DEFAULT_CATEGORY, load_taxonomy
+
+
+def substring_cascade(taxonomy, title):
+    """The per-category keyword loop CategoryClassifier replaced"""
+    title_lower = title.lower()
+    for entry in taxonomy:
+        if any(keyword in title_lower for keyword in entry["keywords"]):
+            return entry["value"]
+    return DEFAULT_CATEGORY
+
+
+def random_titles(taxonomy, count, seed=1):
+    rng = random.Random(seed)
+    keywords = [keyword for entry in taxonomy for keyword in entry["keywords"]]
+    fillers = ["Pro", "wireless", "Set of 2", "XL", "for kids", "premium", "-", "2024"]
+    titles = []
+    for _ in range(count):
+        words = rng.sample(fillers, rng.randint(0, 3)) + rng.sample(keywords, rng.randint(0, 3))
+        rng.shuffle(words)
+        # Keywords glued to other text still match as substrings
+        titles.append(("" if rng.random() < 0.5 else " ").join(
+            word.upper() if rng.random() < 0.2 else word for word in words))
+    return titles
+
+
+def test_matches_substring_cascade():
+    taxonomy = load_taxonomy()
+    classifier = CategoryClassifier(taxonomy)
+    titles = random_titles(taxonomy, 5000)
+    assert classifier.classify_batch(titles) == [substring_cascade(taxonomy, title) for title in titles]
+
+
+def test_earlier_category_wins():
+    taxonomy = [
+        {"value": "A", "keywords": ["phone case"]},
+        {"value": "B", "keywords": ["phone", "case"]},
+    ]
+    classifier = CategoryClassifier(taxonomy)
+    assert classifier.classify("Leather Phone Case") == "A"
+    assert classifier.classify("Phone Stand") == "B"
+    assert classifier.classify("Pencil Case") == "B"
+    assert classifier.classify("Desk Lamp") == DEFAULT_CATEGORY
+
+
+def test_keyword_found_through_failure_link():
+    # Scanning "shers" starts down "shx"; "hers" is only reached by falling back from "sh" to "h"
+    classifier = CategoryClassifier([
+        {"value": "A", "keywords": ["hers"]},
+        {"value": "B", "keywords": ["shx"]},
+    ])
+    assert classifier.classify("shers") == "A"
+    assert classifier.classify("ushx") == "B"
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from category_counts import CategoryCounts
+
+
+def make_counts():
+    db = AsyncMongoMockClient()["test"]
+    return CategoryCounts(db.product_categories, db.category_counts)
+
+
+async def stored(counts):
+    return {(doc["country"], doc["category"]): doc["count"] async for doc in counts.counts.find({})}
+
+
+def product(asin, category, country="US"):
+    return {"asin": asin, "country": country, "category": category, "title": ""}
+
+
+def test_record_counts_new_products_once():
+    async def scenario():
+        counts = make_counts()
+        await counts.record([product("A1", "Home"), product("A2", "Home"), product("A3", "Books", "UK")])
+        await counts.record([product("A1", "Home")])
+        return await stored(counts)
+
+    assert asyncio.run(scenario()) == {("US", "Home"): 2, ("UK", "Books"): 1}
+
+
+def test_record_moves_recategorized_products():
+    async def scenario():
+        counts = make_counts()
+        await counts.record([product("A1", "Home"), product("A2", "Home")])
+        await counts.record([product("A1", "Sports")])
+        return await stored(counts)
+
+    assert asyncio.run(scenario()) == {("US", "Home"): 1, ("US", "Sports"): 1}
+
+
+def test_record_classifies_products_without_a_category():
+    async def scenario():
+        counts = make_counts()
+        await counts.record([{"asin": "A1", "country": "US", "title": "Acme Yoga Mat"}, {"asin": None}])
+        return await stored(counts)
+
+    assert asyncio.run(scenario()) == {("US", "Sports"): 1}
+
+
+def test_reconcile_corrects_drift_and_drops_old_memberships():
+    async def scenario():
+        counts = make_counts()
+        await counts.record([product("A1", "Home"), product("A2", "Home"), product("A3", "Books")])
+        await counts.counts.update_one({"country": "US", "category": "Home"}, {"$inc": {"count": 5}})
+        await counts.memberships.update_one({"asin": "A3"}, {"$set": {"last_seen": datetime.utcnow() - timedelta(days=31)}})
+        await counts.reconcile()
+        return await stored(counts), counts.stats()["corrected"]
+
+    assert asyncio.run(scenario()) == ({("US", "Home"): 2, ("US", "Books"): 0}, 2)
+
+
+def test_get_lists_taxonomy_order_then_total():
+    async def scenario():
+        counts = make_counts()
+        await counts.record([product("A1", "Home"), product("A2", "General"), product("A3", "Home", "UK")])
+        return await counts.get("US"), await counts.get()
+
+    us, everywhere = asyncio.run(scenario())
+    assert [entry["value"] for entry in us] == ["Electronics", "Home", "Beauty", "Sports", "Books", "General", ""]
+    assert us[1]["count"] == 1
+    assert us[-1] == {"name": "All Categories", "value": "", "count": 2}
+    assert everywhere[-1]["count"] == 3
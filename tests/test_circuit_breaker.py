@@ -0,0 +1,79 @@
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("circuit_breaker.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("US", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["opened"] == 1
+
+
+def test_half_open_probe_closes_on_success(clock):
+    breaker = CircuitBreaker("US", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_reopens_on_failure(clock):
+    breaker = CircuitBreaker("US", failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock[0] += 29
+    assert not breaker.allow()
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker("US", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_lost_probe_frees_the_slot_after_reset_timeout(clock):
+    breaker = CircuitBreaker("US", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
+
+
+def test_check_without_probe_claims_nothing(clock):
+    breaker = CircuitBreaker("US", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    assert not breaker.allow(probe=False)
+    clock[0] += 30
+    assert breaker.allow(probe=False)
+    assert breaker.allow(probe=False)
+    assert breaker.allow()
+    assert not breaker.allow(probe=False)
@@ -0,0 +1,45 @@
+import pytest
+
+from compact_results import COMPACT_VERSION, decode_results, encode_results
+
+
+def product(asin, **overrides):
+    fields = {
+        "asin": asin,
+        "title": f"Product {asin}",
+        "image_url": f"https://images.example.com/photo-{asin}?w=300",
+        "price": {"amount": 19.99, "currency": "USD"},
+        "rating": 4.5,
+        "review_count": 120,
+        "category": "Home",
+        "affiliate_url": f"https://www.amazon.com/dp/{asin}?tag=shop-20",
+        "country": "US",
+        "last_updated": "2026-03-01T12:00:00",
+    }
+    fields.update(overrides)
+    return fields
+
+
+def test_compact_round_trip():
+    products = [product("B000000001"), product("B000000002", price=None, image_url=None), product("B000000003")]
+    stored = encode_results(products)
+    assert stored["v"] == COMPACT_VERSION
+    assert stored["images"] == ["https://images.example.com/"]
+    assert decode_results(stored) == products
+
+
+@pytest.mark.parametrize("products", [
+    [],
+    [product("B000000001"), product("B000000002", country="UK")],
+    [product("B000000001"), product("B000000002", affiliate_url="https://example.com/other")],
+    [dict(product("B000000001"), extra=True)],
+])
+def test_pages_outside_the_compact_format_are_stored_as_is(products):
+    stored = encode_results(products)
+    assert stored is products
+    assert decode_results(stored) == products
+
+
+def test_unknown_version_raises():
+    with pytest.raises(ValueError):
+        decode_results({"v": 99})
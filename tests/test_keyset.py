@@ -0,0 +1,26 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from keyset import after_filter, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(timestamp, "a1b2-c3")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "a1b2-c3")
+
+
+def test_after_filter_is_strictly_after_the_cursor():
+    timestamp = datetime(2026, 3, 1, 12, 30)
+    assert after_filter(encode_cursor(timestamp, "b")) == {"$or": [
+        {"timestamp": {"$gt": timestamp}},
+        {"timestamp": timestamp, "id": {"$gt": "b"}},
+    ]}
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(datetime(2026, 1, 1), "x")[:-3]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
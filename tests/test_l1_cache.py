@@ -0,0 +1,65 @@
+from l1_cache import L1Cache, approx_size
+
+
+def test_evicts_least_recently_used_entry():
+    cache = L1Cache("test", max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_by_bytes():
+    value = "x" * 100
+    size = approx_size(value)
+    cache = L1Cache("test", max_entries=100, max_bytes=size * 3)
+    for key in "abcd":
+        cache.set(key, value, ttl=60)
+    assert cache.get("a") is None
+    assert [cache.get(key) for key in "bcd"] == [value] * 3
+    assert cache.stats()["bytes"] == size * 3
+
+
+def test_skips_values_larger_than_the_cache():
+    cache = L1Cache("test", max_bytes=10)
+    cache.set("big", "x" * 100, ttl=60)
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_replacing_a_key_keeps_byte_count():
+    cache = L1Cache("test")
+    cache.set("a", "x" * 10, ttl=60)
+    cache.set("a", "y" * 20, ttl=60)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == approx_size("y" * 20)
+
+
+def test_ttl_and_freshness(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("l1_cache.time.monotonic", lambda: now[0])
+    cache = L1Cache("test")
+    cache.set("a", 1, ttl=60, fresh_ttl=10)
+    assert cache.lookup("a") == (1, False)
+    now[0] += 30
+    assert cache.lookup("a") == (1, True)
+    now[0] += 31
+    assert cache.lookup("a") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["bytes"] == 0
+
+
+def test_remaining_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("l1_cache.time.monotonic", lambda: now[0])
+    cache = L1Cache("test")
+    cache.set("a", 1, ttl=60, fresh_ttl=10)
+    now[0] += 15
+    assert cache.remaining_ttl("a") == (45, -5)
+    assert cache.remaining_ttl("b") is None
+    now[0] += 45
+    assert cache.remaining_ttl("a") is None
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker, UpstreamUnavailable
+from mock_paapi import MockCatalog, MockPAAPI
+from paapi import PAAPIClient
+from rate_limiter import TokenBucketLimiter
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setenv("PAAPI_ACCESS_KEY", "test")
+    monkeypatch.setenv("PAAPI_SECRET_KEY", "test")
+    monkeypatch.setenv("PARTNER_TAG", "test-20")
+
+
+def half_open_breaker():
+    breaker = CircuitBreaker("US", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    # As if reset_timeout had already passed
+    breaker._opened_at -= 30
+    return breaker
+
+
+def test_rate_limit_rejection_does_not_hold_the_probe_slot():
+    async def scenario():
+        breaker = half_open_breaker()
+        limiter = TokenBucketLimiter("US", rate=1, burst=1, max_queue=0)
+        client = PAAPIClient("US", limiter=limiter, breaker=breaker, backend=MockPAAPI(MockCatalog(100), "US"))
+        await limiter.acquire()
+        with pytest.raises(UpstreamUnavailable, match="queue full"):
+            await client.search_products_async("yoga")
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_call_releases_the_probe_slot():
+    async def scenario():
+        breaker = half_open_breaker()
+        backend = MockPAAPI(MockCatalog(100), "US", latency_ms=200)
+        client = PAAPIClient("US", breaker=breaker, backend=backend)
+        call = asyncio.ensure_future(client.search_products_async("yoga"))
+        await asyncio.sleep(0.05)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.allow()
+
+
+def test_probe_success_closes_the_breaker():
+    async def scenario():
+        breaker = half_open_breaker()
+        client = PAAPIClient("US", breaker=breaker, backend=MockPAAPI(MockCatalog(100), "US"))
+        response = await client.search_products_async("yoga")
+        return breaker, response
+
+    breaker, response = asyncio.run(scenario())
+    assert breaker.state == CLOSED
+    assert len(response.items) == 10
@@ -0,0 +1,73 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from query_counter import QueryCounterBuffer
+
+
+class FlakyCollection:
+    """Collection whose next ``failures`` bulk writes fail"""
+
+    def __init__(self, collection, failures=0, delay=0.0):
+        self.collection = collection
+        self.failures = failures
+        self.delay = delay
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("write failed")
+        return await self.collection.bulk_write(operations, ordered=ordered)
+
+
+async def counts(collection):
+    return {doc["query"]: doc["count"] async for doc in collection.find({})}
+
+
+def test_increments_are_merged_into_one_write():
+    async def scenario():
+        collection = AsyncMongoMockClient()["test"]["search_queries"]
+        buffer = QueryCounterBuffer(collection)
+        for query in ["Yoga Mat", "yoga mat", "lamp"]:
+            buffer.increment(query)
+        await buffer.flush()
+        return await counts(collection), buffer.stats()
+
+    stored, stats = asyncio.run(scenario())
+    assert stored == {"yoga mat": 2, "lamp": 1}
+    assert stats["flushes"] == 1
+    assert stats["written"] == 2
+    assert stats["pending"] == 0
+
+
+def test_failed_flush_requeues_counts():
+    async def scenario():
+        collection = AsyncMongoMockClient()["test"]["search_queries"]
+        buffer = QueryCounterBuffer(FlakyCollection(collection, failures=1))
+        buffer.increment("lamp", by=2)
+        await buffer.flush()
+        assert buffer.stats()["pending"] == 1
+        buffer.increment("lamp")
+        await buffer.flush()
+        return await counts(collection), buffer.stats()
+
+    stored, stats = asyncio.run(scenario())
+    assert stored == {"lamp": 3}
+    assert stats["errors"] == 1
+    assert stats["pending"] == 0
+
+
+def test_stop_waits_for_an_in_flight_flush():
+    async def scenario():
+        collection = AsyncMongoMockClient()["test"]["search_queries"]
+        buffer = QueryCounterBuffer(FlakyCollection(collection, delay=0.05), flush_interval=0.01)
+        buffer.increment("lamp")
+        buffer.start()
+        # Stop while the periodic flush is still writing
+        await asyncio.sleep(0.03)
+        buffer.increment("mug")
+        await buffer.stop()
+        return await counts(collection)
+
+    assert asyncio.run(scenario()) == {"lamp": 1, "mug": 1}
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from circuit_breaker import UpstreamUnavailable
+from rate_limiter import BACKGROUND, INTERACTIVE, TokenBucketLimiter
+
+
+def test_interactive_callers_overtake_queued_background_ones():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=100, burst=1)
+        await limiter.acquire(INTERACTIVE)
+        order = []
+
+        async def caller(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+
+        background = [asyncio.ensure_future(caller(f"bg{i}", BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = [asyncio.ensure_future(caller(f"ui{i}", INTERACTIVE)) for i in range(2)]
+        await asyncio.gather(*background, *interactive)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["ui0", "ui1", "bg0", "bg1", "bg2"]
+    assert stats["priorities"]["interactive"]["acquired"] == 3
+    assert stats["priorities"]["background"]["waited"] == 3
+
+
+def test_full_queue_rejects():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=10, burst=1, max_queue=1)
+        await limiter.acquire(INTERACTIVE)
+        queued = asyncio.ensure_future(limiter.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(UpstreamUnavailable, match="queue full"):
+            await limiter.acquire(INTERACTIVE)
+        await queued
+        return limiter.rejected
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_rejects_when_queue_ahead_exceeds_max_wait():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=10, burst=1, max_wait=0.15)
+        await limiter.acquire(INTERACTIVE)
+        queued = asyncio.ensure_future(limiter.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        # One caller ahead at 10/s puts this one about 0.2s out
+        with pytest.raises(UpstreamUnavailable, match="wait too long"):
+            await limiter.acquire(INTERACTIVE)
+        await queued
+
+    asyncio.run(scenario())
+
+
+def test_zero_rate_disables_limiting():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=0)
+        for _ in range(100):
+            await limiter.acquire(BACKGROUND)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["priorities"]["background"]["acquired"] == 100
+    assert stats["queue_depth"] == 0
+
+
+def test_rejects_a_caller_expected_to_wait_the_full_max_wait():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=10, burst=1, max_wait=0.2)
+        await limiter.acquire(INTERACTIVE)
+        queued = asyncio.ensure_future(limiter.acquire(INTERACTIVE))
+        await asyncio.sleep(0)
+        # Expected to wait 0.2s, exactly max_wait: it would only time out
+        with pytest.raises(UpstreamUnavailable, match="wait too long"):
+            await limiter.acquire(INTERACTIVE)
+        await queued
+        return limiter.stats()["priorities"]["interactive"]["timeouts"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_fan_out_fits_within_max_wait():
+    async def scenario():
+        limiter = TokenBucketLimiter("US", rate=20, burst=1, max_wait=0.5)
+        fan_out = limiter.fan_out(INTERACTIVE)
+        # That many callers at once all get admitted
+        await asyncio.gather(*[limiter.acquire(INTERACTIVE) for _ in range(fan_out)])
+        return fan_out, limiter.rejected
+
+    assert asyncio.run(scenario()) == (9, 0)
+    assert TokenBucketLimiter("US", rate=0).fan_out() is None
@@ -0,0 +1,41 @@
+import gzip
+
+import pytest
+
+from response_bodies import choose_variant, compress, encoding_qualities
+
+VARIANTS = {"br": b"brotli", "gzip": b"gzipped"}
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *", "gzip"),
+    ("br;q=0, gzip;q=0, *", None),
+    ("gzip;q=bogus", None),
+    ("identity", None),
+    ("", None),
+    (None, None),
+])
+def test_choose_variant(accept_encoding, expected):
+    encoding, body = choose_variant(VARIANTS, accept_encoding)
+    assert encoding == expected
+    assert body == (VARIANTS[expected] if expected else None)
+
+
+def test_choose_variant_skips_codings_not_stored():
+    assert choose_variant({"gzip": b"gzipped"}, "br, gzip") == ("gzip", b"gzipped")
+    assert choose_variant({}, "br, gzip") == (None, None)
+
+
+def test_encoding_qualities():
+    assert encoding_qualities("br;q=0.8, gzip , *;q=0") == {"br": 0.8, "gzip": 1.0, "*": 0.0}
+
+
+def test_compress_skips_small_bodies():
+    assert compress(b"{}", ["gzip"]) == {}
+    body = b'{"products":[' + b'{"asin":"B000000001"},' * 100 + b'{}]}'
+    assert gzip.decompress(compress(body, ["gzip"])["gzip"]) == body
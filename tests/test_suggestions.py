@@ -0,0 +1,72 @@
+from suggestions import SuggestionIndex
+
+
+def test_complete_orders_by_count_then_query():
+    index = SuggestionIndex(top_k=3)
+    index.load([("yoga mat", 5), ("yoga block", 9), ("yoga strap", 5), ("yogurt maker", 1), ("lamp", 20)])
+    assert index.complete("yo") == [("yoga block", 9), ("yoga mat", 5), ("yoga strap", 5)]
+    assert index.complete("YOGU") == [("yogurt maker", 1)]
+    assert index.complete("z") == []
+    assert index.popular(2) == [("lamp", 20), ("yoga block", 9)]
+
+
+def test_increment_promotes_into_top_k():
+    index = SuggestionIndex(top_k=2)
+    index.load([("mug", 3), ("mug warmer", 2), ("mug tree", 1)])
+    assert index.complete("mug") == [("mug", 3), ("mug warmer", 2)]
+    index.increment("Mug Tree", by=3)
+    assert index.complete("mug") == [("mug tree", 4), ("mug", 3)]
+    assert index.complete("mug t") == [("mug tree", 4)]
+
+
+def test_top_k_matches_brute_force():
+    entries = [(f"q{i % 7}{i % 11}{i}", (i * 37) % 101) for i in range(500)]
+    index = SuggestionIndex(top_k=5)
+    index.load(entries)
+    for prefix in ["q", "q3", "q31", "q310"]:
+        expected = sorted((-count, query) for query, count in entries if query.startswith(prefix))[:5]
+        assert index.complete(prefix, 5) == [(query, -count) for count, query in expected]
+
+
+def test_index_words_matches_later_words():
+    index = SuggestionIndex(top_k=5, index_words=True)
+    index.load([("wireless earbuds", 4), ("earbuds case", 2)])
+    assert index.complete("ear") == [("wireless earbuds", 4), ("earbuds case", 2)]
+    assert index.complete("case") == [("earbuds case", 2)]
+
+
+def test_long_queries_and_word_starts_are_capped():
+    index = SuggestionIndex(index_words=True, max_query_length=20, max_word_starts=2)
+    index.increment("ab " * 2000)
+    assert index.counts == {}
+    assert index.nodes == 1
+    index.increment("a b c d e")
+    assert index.complete("c") == [("a b c d e", 1)]
+    assert index.complete("d") == []
+
+
+def test_evicts_lowest_counts_beyond_max_queries():
+    index = SuggestionIndex(max_queries=2)
+    index.load([("lamp", 5), ("mug", 3)])
+    index.increment("mat")
+    assert set(index.counts) == {"lamp", "mug"}
+    index.increment("mat", by=9)
+    assert set(index.counts) == {"lamp", "mat"}
+    # "mat" was evicted on arrival, so its count starts over
+    assert index.complete("m") == [("mat", 9)]
+    assert index.stats()["evictions"] == 2
+
+
+def test_evicted_branches_are_pruned():
+    index = SuggestionIndex(index_words=True, max_nodes=40)
+    for i in range(50):
+        index.increment(f"query number {i}", by=i + 1)
+    assert index.nodes <= 40
+    assert index.complete("number 49") == [("query number 49", 50)]
+    # Recount the trie to check the node counter
+    stack, nodes = [index._root], 0
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        stack.extend(node.children.values())
+    assert nodes == index.nodes